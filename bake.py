@@ -0,0 +1,163 @@
+"""Bakes the skyscraper OBJ/MTL models into flattened BAM files.
+
+The game loads `assets/baked/*.bam` when present and falls back to the OBJ
+files otherwise. Each baked model carries its upright tight-bounds extents
+("extents") and the scale that normalizes it to a unit box ("normalize")
+as tags on the root node, so nothing has to walk the geometry at runtime.
+
+Below the root sits an LODNode with the full mesh followed by coarser
+levels made by vertex-clustering decimation (see `decimate`). The game
+sets the switch distances itself from GameSettings.
+
+    uv run python bake.py            # bake every variant
+    uv run python bake.py --report   # also compare cold and warm load times
+"""
+import argparse
+import math
+import os
+import time
+
+from panda3d.core import (
+    Filename, Geom, GeomNode, GeomTriangles, GeomVertexData, GeomVertexReader, GeomVertexWriter, LODNode,
+    ModelPool, ModelRoot, NodePath, TexturePool, Thread, Vec3, loadPrcFileData,
+)
+
+from main import GameSettings, SKYSCRAPER_HPR, SKYSCRAPER_VARIANTS, baked_model_path, count_triangles, lod_edges
+
+loadPrcFileData("", "window-type none")
+loadPrcFileData("", "audio-library-name null")
+
+
+def obj_model_path(variant):
+    return f"assets/building-skyscraper-{variant}.obj"
+
+
+def decimate_geom(geom, cell):
+    """Vertex clustering: merge every vertex in the same `cell`-sized grid
+    cube into one at their mean position and drop the triangles that
+    collapse. Other columns (normal, UV) come from the first vertex seen."""
+    vdata = geom.getVertexData()
+    reader = GeomVertexReader(vdata, "vertex")
+    clusters = {}
+    cluster_of = []
+    for row in range(vdata.getNumRows()):
+        v = reader.getData3()
+        key = (math.floor(v.x / cell), math.floor(v.y / cell), math.floor(v.z / cell))
+        cluster = clusters.get(key)
+        if cluster is None:
+            cluster = clusters[key] = [len(clusters), row, Vec3(0, 0, 0), 0]
+        cluster[2] += v
+        cluster[3] += 1
+        cluster_of.append(cluster[0])
+
+    merged = GeomVertexData(vdata.getName(), vdata.getFormat(), Geom.UH_static)
+    merged.setNumRows(len(clusters))
+    writer = GeomVertexWriter(merged, "vertex")
+    thread = Thread.getCurrentThread()
+    for index, row, total, count in clusters.values():
+        merged.copyRowFrom(index, vdata, row, thread)
+        writer.setRow(index)
+        writer.setData3(total / count)
+
+    tris = GeomTriangles(Geom.UH_static)
+    seen = set()
+    for prim in geom.getPrimitives():
+        prim = prim.decompose()
+        for i in range(prim.getNumPrimitives()):
+            start = prim.getPrimitiveStart(i)
+            a, b, c = (cluster_of[prim.getVertex(start + k)] for k in range(3))
+            key = frozenset((a, b, c))
+            if len(key) < 3 or key in seen:
+                continue
+            seen.add(key)
+            tris.addVertices(a, b, c)
+    decimated = Geom(merged)
+    if tris.getNumPrimitives():
+        decimated.addPrimitive(tris)
+    return decimated
+
+
+def decimate(mesh: NodePath, cell):
+    out = NodePath("decimated")
+    for gnp in mesh.findAllMatches("**/+GeomNode"):
+        gnode = GeomNode(gnp.getName())
+        for geom, state in zip(gnp.node().getGeoms(), gnp.node().getGeomStates()):
+            decimated = decimate_geom(geom, cell)
+            if decimated.getNumPrimitives():
+                gnode.addGeom(decimated, state)
+        out.attachNewNode(gnode).setState(gnp.getNetState())
+    return out
+
+
+def bake(loader, variant, cells):
+    model = loader.loadModel(obj_model_path(variant), noCache=True)
+    model.flattenStrong()
+    model.setHpr(*SKYSCRAPER_HPR)
+    lo, hi = model.getTightBounds()
+    model.setHpr(0, 0, 0)
+    extents = hi - lo
+
+    root = NodePath(ModelRoot(model.getName()))
+    root.setTag("extents", " ".join(f"{e:.6f}" for e in extents))
+    root.setTag("normalize", " ".join(f"{1 / e:.6f}" for e in extents))
+    lod_np = root.attachNewNode(LODNode("lod"))
+    full = lod_np.attachNewNode("lod0")
+    for child in model.getChildren():
+        child.reparentTo(full)
+    levels = [full]
+    for level, cell in enumerate(cells, 1):
+        # cells are fractions of the model's largest extent
+        coarse = decimate(full, cell * max(extents))
+        coarse.setName(f"lod{level}")
+        coarse.reparentTo(lod_np)
+        levels.append(coarse)
+    # defaults only; the game reconfigures the switches from its settings
+    edges = lod_edges(len(levels), GameSettings())
+    for level in range(len(levels)):
+        lod_np.node().addSwitch(edges[level + 1], edges[level])
+
+    out = baked_model_path(variant)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    root.writeBamFile(Filename(out))
+    return out, [count_triangles(level) for level in levels]
+
+
+def load_times(loader, path, repeat):
+    ModelPool.releaseAllModels()
+    TexturePool.releaseAllTextures()
+    start = time.perf_counter()
+    loader.loadModel(path, noCache=True)
+    cold = time.perf_counter() - start
+    loader.loadModel(path)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        loader.loadModel(path)
+    warm = (time.perf_counter() - start) / repeat
+    return cold, warm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report", action="store_true", help="print cold and warm load times for OBJ and BAM")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--lod-cells", type=float, nargs="*", default=[0.04, 0.12],
+                        help="decimation grid size of each extra LOD level, as a fraction of the model's largest extent")
+    args = parser.parse_args()
+
+    from direct.showbase.ShowBase import ShowBase
+    base = ShowBase()
+    for variant in SKYSCRAPER_VARIANTS:
+        out, triangles = bake(base.loader, variant, args.lod_cells)
+        print(f"baked {out} (triangles per LOD: {', '.join(map(str, triangles))})")
+
+    if not args.report:
+        return
+    print(f"{'variant':>8} {'obj cold ms':>12} {'bam cold ms':>12} {'obj warm ms':>12} {'bam warm ms':>12}")
+    for variant in SKYSCRAPER_VARIANTS:
+        obj_cold, obj_warm = load_times(base.loader, obj_model_path(variant), args.repeat)
+        bam_cold, bam_warm = load_times(base.loader, baked_model_path(variant), args.repeat)
+        print(f"{variant:>8} {obj_cold * 1e3:>12.2f} {bam_cold * 1e3:>12.2f} {obj_warm * 1e3:>12.3f} {bam_warm * 1e3:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,508 @@
+"""Microbenchmarks for the game's data structures and render paths.
+
+    uv run python bench.py spatial
+    uv run python bench.py instancing
+    uv run python bench.py store
+    uv run python bench.py physics
+    uv run python bench.py colliders
+
+`city` is the regression suite: it times the systems whose cost grows
+with the city in whole GameScenes of 100, 1k and 10k buildings, writes
+the results as JSON and fails if any metric got slower than in a stored
+baseline. Baselines only hold for the machine they were recorded on;
+record a new one by pointing --out at it:
+
+    uv run python bench.py city --baseline bench-baseline.json
+    uv run python bench.py city --out bench-baseline.json
+
+Benchmarks that render use an offscreen buffer. On a machine without a
+display, pass e.g. `--display p3headlessgl` to render through EGL.
+"""
+import argparse
+from collections import defaultdict
+from dataclasses import dataclass
+import itertools
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from panda3d.core import AmbientLight, DirectionalLight, NodePath, Vec2, Vec3, loadPrcFileData
+
+from main import (
+    BOX_MODEL, CollisionGroup, ExpiryQueue, GameScene, GameSettings, IdleControls, InstancedSkyscrapers, ModelRegistry, NodeSkyscrapers,
+    NullProfiler, PowerupTypes, Run, SKYSCRAPER_VARIANTS, SkyscraperStore, SpatialHash, SpawnJob, id_counter, np,
+    skyscraper_model_path,
+)
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def random_footprints(n, rng):
+    # keep density roughly constant so the city just gets bigger with n
+    extent = (n ** 0.5) * 25
+    for _ in range(n):
+        pos = Vec2(rng.uniform(-extent, extent), rng.uniform(-extent, extent))
+        scale = Vec2(rng.randint(5, 12), rng.randint(5, 12))
+        yield pos, scale, extent
+
+
+def linear_intersects(footprints, pos, scale):
+    for other_pos, other_scale in footprints:
+        if (abs(pos.x - other_pos.x) * 2 < (scale.x + other_scale.x) and
+            abs(pos.y - other_pos.y) * 2 < (scale.y + other_scale.y)):
+            return True
+    return False
+
+
+def bench_spatial(args):
+    rng = random.Random(args.seed)
+    print(f"{'buildings':>10} {'linear us':>12} {'hash us':>12} {'speedup':>9}")
+    for n in args.sizes:
+        footprints = []
+        index = SpatialHash()
+        extent = 0
+        for id, (pos, scale, extent) in enumerate(random_footprints(n, rng)):
+            footprints.append((pos, scale))
+            index.insert(id, pos, scale)
+        queries = [
+            (Vec2(rng.uniform(-extent, extent), rng.uniform(-extent, extent)), Vec2(rng.randint(5, 12), rng.randint(5, 12)))
+            for _ in range(args.queries)
+        ]
+        for pos, scale in queries:
+            assert linear_intersects(footprints, pos, scale) == index.intersects(pos, scale)
+
+        linear = timed(lambda: [linear_intersects(footprints, p, s) for p, s in queries], args.repeat) / len(queries)
+        hashed = timed(lambda: [index.intersects(p, s) for p, s in queries], args.repeat) / len(queries)
+        print(f"{n:>10} {linear * 1e6:>12.2f} {hashed * 1e6:>12.2f} {linear / hashed:>8.1f}x")
+
+
+def offscreen_base(display):
+    from direct.showbase.ShowBase import ShowBase
+    loadPrcFileData("", "window-type offscreen")
+    loadPrcFileData("", "audio-library-name null")
+    loadPrcFileData("", "sync-video false")
+    if display:
+        loadPrcFileData("", f"load-display {display}")
+    return ShowBase()
+
+
+def frame_time(base, frames):
+    for _ in range(3):
+        base.graphicsEngine.renderFrame()
+    start = time.perf_counter()
+    for _ in range(frames):
+        base.graphicsEngine.renderFrame()
+    return (time.perf_counter() - start) / frames
+
+
+COARSE_LEVELS = {f"lod{level}" for level in range(1, 8)}
+
+
+def draw_calls(root):
+    total = 0
+    for gnp in root.findAllMatches("**/+GeomNode"):
+        # with culling off only the full-detail LOD level is ever drawn
+        if gnp.isHidden() or any(a.getName() in COARSE_LEVELS for a in gnp.getAncestors()):
+            continue
+        total += gnp.node().getNumGeoms()
+    return total
+
+
+def bench_instancing(args):
+    base = offscreen_base(args.display)
+    models = ModelRegistry(base.loader)
+    dlnp = base.render.attachNewNode(DirectionalLight("dlight"))
+    dlnp.setHpr(-45, -45, 0)
+    base.render.setLight(dlnp)
+    alight = AmbientLight("alight")
+    alight.setColor((0.3, 0.3, 0.3, 1))
+    base.render.setLight(base.render.attachNewNode(alight))
+
+    # full detail and no culling, so both paths draw every building
+    settings = GameSettings(lod_distances=(), cull_distance=float("inf"))
+    print(f"{'buildings':>10} {'per-node ms':>12} {'draws':>7} {'instanced ms':>13} {'draws':>7} {'speedup':>9}")
+    for n in args.sizes:
+        rng = random.Random(args.seed)
+        side = int(n ** 0.5) + 1
+        layout = [
+            (Vec3((i % side) * 20, (i // side) * 20, 0),
+             Vec3(rng.randint(5, 12), rng.randint(5, 12), rng.randint(1, 4) * 10),
+             skyscraper_model_path(rng.choice(SKYSCRAPER_VARIANTS)))
+            for i in range(n)
+        ]
+        # frame the whole city from above
+        base.camera.setPos(side * 10, -side * 10, side * 14)
+        base.camera.lookAt(side * 10, side * 10, 0)
+
+        times = []
+        draws = []
+        for renderer_cls in (NodeSkyscrapers, InstancedSkyscrapers):
+            city = base.render.attachNewNode("city")
+            if renderer_cls is InstancedSkyscrapers:
+                renderer = renderer_cls(models, city, settings)
+            else:
+                renderer = renderer_cls(models, settings)
+            store = SkyscraperStore()
+            for id, (pos, scale, path) in enumerate(layout):
+                model = models.instance(path)
+                model.setHpr(0, 90, 0)
+                ss = store.add(id=id, node_path=city.attachNewNode(f"Skyscraper#{id}"), pos=pos, scale=scale, model=model)
+                ss.node_path.setPos(pos.x, pos.y, scale.z/2)
+                renderer.add(ss)
+            renderer.flush()
+            draws.append(draw_calls(city))
+            times.append(frame_time(base, args.frames))
+            renderer.destroy()
+            city.removeNode()
+        per_node, instanced = times
+        print(f"{n:>10} {per_node * 1e3:>12.2f} {draws[0]:>7} {instanced * 1e3:>13.2f} {draws[1]:>7} {per_node / instanced:>8.1f}x")
+
+
+@dataclass
+class LegacySkyscraper:
+    """The per-object record SkyscraperStore replaced, kept for comparison."""
+    id: int
+    node_path: object
+    pos: Vec2
+    scale: Vec3
+    ttl: int
+    model: object
+    timer_triggered: bool = False
+    powerup: object = None
+
+
+def legacy_outside(skyscrapers, center, radius):
+    far = []
+    for ss in skyscrapers.values():
+        nx = min(max(center.x, ss.pos.x - ss.scale.x/2), ss.pos.x + ss.scale.x/2)
+        ny = min(max(center.y, ss.pos.y - ss.scale.y/2), ss.pos.y + ss.scale.y/2)
+        if (nx - center.x)**2 + (ny - center.y)**2 > radius**2:
+            far.append(ss.id)
+    return far
+
+
+def legacy_mid_distances(skyscrapers, center):
+    ids, distances = [], []
+    for ss in skyscrapers.values():
+        ids.append(ss.id)
+        distances.append((Vec3(ss.pos.x, ss.pos.y, ss.scale.z/2) - center).length())
+    return ids, distances
+
+
+def build_store(layout):
+    store = SkyscraperStore()
+    for id, (pos, scale) in enumerate(layout):
+        store.add(id=id, node_path=None, pos=pos, scale=scale, model=None)
+    return store
+
+
+def build_legacy(layout):
+    return {id: LegacySkyscraper(id=id, node_path=None, pos=pos, scale=scale, ttl=5, model=None)
+            for id, (pos, scale) in enumerate(layout)}
+
+
+def allocated(build, layout):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    city = build(layout)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return city, size
+
+
+def bench_store(args):
+    # tracemalloc only sees Python allocations, so the C++ side of each Vec
+    # in the dataclass records isn't counted; its bytes are a lower bound
+    rng = random.Random(args.seed)
+    # main imports numpy lazily; load it now, or the first store's size counts it
+    np.ndarray
+    print(f"{'buildings':>10} {'record B':>9} {'store B':>8} {'record us':>10} {'store us':>9} {'speedup':>9}")
+    for n in args.sizes:
+        layout = [
+            (Vec2(pos.x, pos.y), Vec3(scale.x, scale.y, rng.randint(1, 4) * 10))
+            for pos, scale, extent in random_footprints(n, rng)
+        ]
+        center = Vec3(0, 0, 30)
+        radius = (n ** 0.5) * 12
+        sizes, times, evicted = [], [], []
+        for build, outside, distances in (
+            (build_legacy, legacy_outside, legacy_mid_distances),
+            (build_store, SkyscraperStore.outside, SkyscraperStore.mid_distances),
+        ):
+            city, size = allocated(build, layout)
+            # one streaming update: the eviction scan plus the LOD distances
+            update = lambda: (outside(city, center, radius), distances(city, center))
+            sizes.append(size / n)
+            times.append(timed(update, args.repeat))
+            evicted.append(sorted(outside(city, center, radius)))
+        assert evicted[0] == evicted[1]
+        print(f"{n:>10} {sizes[0]:>9.0f} {sizes[1]:>8.0f} {times[0] * 1e6:>10.0f} {times[1] * 1e6:>9.0f} {times[0] / times[1]:>8.1f}x")
+
+
+def physics_city(n, filtered, seed, settings=None):
+    import sim
+    from panda3d.bullet import BulletWorld
+    random.seed(seed)
+    game_np = sim.base.render.attachNewNode(NodePath("game").node())
+    scene = GameScene(
+        BulletWorld(), game_np, sim.models, NodePath("camera"), None, sim.base.aspect2d, sim.HeadlessFSM(),
+        settings if settings is not None else GameSettings(), Run(), controls=sim.BotControls(random.Random(seed)),
+    )
+    if not filtered:
+        # every body pairs with every other, as with no filtering at all; the
+        # player's powerup sensor keeps to powerups so pickups still work
+        for a, b in itertools.combinations_with_replacement(CollisionGroup, 2):
+            if CollisionGroup.SENSOR not in (a, b):
+                scene.world.setGroupCollisionFlag(a, b, True)
+        scene.world.setForceUpdateAllAabbs(True)
+    fill_city(scene, n)
+    return game_np, scene
+
+
+def fill_city(scene, n):
+    """Builds `n` skyscrapers in a grid beside the home building, sized,
+    styled and given powerups from `random` the way the game rolls them."""
+    side = int(n ** 0.5) + 1
+    for i in range(n):
+        scene.build_skyscraper(SpawnJob(
+            id=next(id_counter),
+            pos=Vec3((i % side) * 20 + 40, (i // side) * 20, 0),
+            scale=Vec3(random.randint(5, 12), random.randint(5, 12), random.randint(1, 4) * 10),
+            model_path=skyscraper_model_path(random.choice(SKYSCRAPER_VARIANTS)),
+            powerup=random.choice([None, *PowerupTypes]),
+        ))
+
+
+def bench_physics(args):
+    import sim
+    sim.init_worker()
+    step = GameSettings.physics_step
+    print(f"{'buildings':>10} {'bodies':>7} {'filtered':>9} {'manifolds':>10} {'doPhysics ms':>13} {'collisions ms':>14}")
+    for n in args.sizes:
+        for filtered in (False, True):
+            game_np, scene = physics_city(n, filtered, args.seed)
+            world = scene.world
+            bodies = world.getNumRigidBodies() + world.getNumGhosts()
+            # stand on the home building while the city settles around it
+            for _ in range(10):
+                world.doPhysics(step, 1, step)
+            physics = collisions = 0.0
+            for _ in range(args.frames):
+                start = time.perf_counter()
+                world.doPhysics(step, 1, step)
+                mid = time.perf_counter()
+                scene.process_collisions()
+                physics += mid - start
+                collisions += time.perf_counter() - mid
+            manifolds = world.getNumManifolds()
+            scene.destroy()
+            game_np.removeNode()
+            print(f"{n:>10} {bodies:>7} {str(filtered):>9} {manifolds:>10} "
+                  f"{physics / args.frames * 1e3:>13.3f} {collisions / args.frames * 1e3:>14.3f}")
+
+
+def bench_colliders(args):
+    import sim
+    sim.init_worker()
+    step = GameSettings.physics_step
+    print(f"{'buildings':>10} {'layout':>8} {'proxies':>8} {'doPhysics ms':>13} {'collisions ms':>14} {'rebuild ms':>11}")
+    for n in args.sizes:
+        for layout, chunk_size in (("bodies", 0), ("chunks", args.chunk_size)):
+            game_np, scene = physics_city(n, True, args.seed, GameSettings(collision_chunk_size=chunk_size))
+            world = scene.world
+            proxies = world.getNumRigidBodies() + world.getNumGhosts()
+            for _ in range(10):
+                world.doPhysics(step, 1, step)
+            physics = median_ms(lambda i: world.doPhysics(step, 1, step), args.frames)
+            collisions = median_ms(lambda i: scene.process_collisions(), args.frames)
+
+            # take a building out and put it back, as expiry and streaming do
+            rng = random.Random(args.seed)
+            ids = list(scene.skyscrapers.keys())
+
+            def rebuild(i):
+                ss = scene.skyscrapers[ids[i]]
+                job = SpawnJob(id=ss.id, pos=Vec3(ss.pos.x, ss.pos.y, 0), scale=ss.scale,
+                               model_path=ss.model.getTag("model"), powerup=ss.powerup)
+                scene.remove_skyscraper(ss)
+                scene.build_skyscraper(job)
+            rng.shuffle(ids)
+            rebuilt = median_ms(rebuild, min(args.frames, len(ids)))
+            scene.destroy()
+            game_np.removeNode()
+            print(f"{n:>10} {layout:>8} {proxies:>8} {physics:>13.3f} {collisions:>14.3f} {rebuilt:>11.3f}")
+
+
+def median_ms(fn, calls):
+    """Median wall time of `calls` calls of `fn(i)`, in ms."""
+    times = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1e3
+
+
+def time_city(base, models, n, args):
+    from panda3d.bullet import BulletWorld
+    from sim import HeadlessFSM
+    random.seed(args.seed)
+    game_np = base.render.attachNewNode(NodePath("game").node())
+    # nothing is streamed out, so every building stays in the scene
+    settings = GameSettings(stream_radius=float("inf"))
+    scene = GameScene(
+        BulletWorld(), game_np, models, base.camera, base.win, base.aspect2d, HeadlessFSM(),
+        settings, Run(), controls=IdleControls(), profiler=NullProfiler(),
+    )
+    fill_city(scene, n)
+    step = settings.physics_step
+    world = scene.world
+    # land on the home building and let the city settle around it
+    for _ in range(10):
+        scene.advance(1 / 60)
+        base.graphicsEngine.renderFrame()
+
+    def frame(i):
+        scene.advance(1 / 60)
+        base.graphicsEngine.renderFrame()
+
+    calls = args.frames
+    rng = random.Random(args.seed)
+    medians = defaultdict(list)
+    # each round times every metric once, so a busy spell on the machine
+    # only spoils one round of each and the best round is kept
+    for _ in range(args.rounds):
+        medians["frame_ms"].append(median_ms(frame, calls))
+        medians["doPhysics_ms"].append(median_ms(lambda i: world.doPhysics(step, 1, step), calls))
+        medians["process_collisions_ms"].append(median_ms(lambda i: scene.process_collisions(), calls))
+
+        # neighbours of random buildings; their footprints are only
+        # reserved, so dropping the queue afterwards leaves the city as it was
+        ids = list(scene.skyscrapers.keys())
+        picks = [rng.choice(ids) for _ in range(calls)]
+        medians["spawn_neighbours_ms"].append(median_ms(lambda i: scene.spawn_neighbours(scene.skyscrapers[picks[i]]), calls))
+        for _, id, job in scene.spawn_queue:
+            scene.ss_index.remove(id)
+        scene.spawn_queue.clear()
+
+        # every building on a timer: one expires per timed call, the rest
+        # only after the last, so the queue is as long as the city; the
+        # expired ones are built again and the leftover timers dropped
+        rebuild = [
+            SpawnJob(id=next(id_counter), pos=Vec3(ss.pos.x, ss.pos.y, 0), scale=ss.scale,
+                     model_path=ss.model.getTag("model"), powerup=ss.powerup)
+            for ss in map(scene.skyscrapers.get, ids[:calls])
+        ]
+        decay = settings.ttl_decay_rate * step
+        for i, id in enumerate(ids):
+            scene.expiry.schedule((min(i, calls) + 0.5) * decay, id)
+        medians["update_ttl_ms"].append(median_ms(lambda i: scene.update_ttl(step), calls))
+        scene.expiry = ExpiryQueue()
+        for job in rebuild:
+            scene.build_skyscraper(job)
+
+    scene.destroy()
+    game_np.removeNode()
+    return {name: min(ms) for name, ms in medians.items()}
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Prints every metric against the baseline and returns the ones that
+    got slower by more than `threshold` and `min_delta_ms` both."""
+    regressions = []
+    print(f"{'buildings':>10} {'metric':<24} {'baseline ms':>12} {'now ms':>10} {'change':>8}")
+    for size, metrics in results.items():
+        for name, now in metrics.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            change = now / before - 1 if before else 0.0
+            flag = ""
+            if change > threshold and now - before > min_delta_ms:
+                regressions.append(f"{name} at {size} buildings {before:.3f} -> {now:.3f} ms")
+                flag = " !"
+            print(f"{size:>10} {name:<24} {before:>12.3f} {now:>10.3f} {change:>+7.0%}{flag}")
+    return regressions
+
+
+def bench_city(args):
+    base = offscreen_base(args.display)
+    models = ModelRegistry(base.loader)
+    models.preload([*map(skyscraper_model_path, SKYSCRAPER_VARIANTS), BOX_MODEL])
+    results = {}
+    for n in args.sizes:
+        results[str(n)] = time_city(base, models, n, args)
+        print(f"{n:>10} buildings: " + ", ".join(f"{name} {ms:.3f}" for name, ms in results[str(n)].items()))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"seed": args.seed, "frames": args.frames, "rounds": args.rounds, "results": results}, f, indent=2)
+            f.write("\n")
+    if not args.baseline:
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if (baseline["seed"], baseline["frames"], baseline["rounds"]) != (args.seed, args.frames, args.rounds):
+        raise SystemExit(f"{args.baseline} was recorded with a different --seed, --frames or --rounds")
+    regressions = compare(results, baseline["results"], args.threshold, args.min_delta_ms)
+    if regressions:
+        raise SystemExit(f"{len(regressions)} metrics regressed more than {args.threshold:.0%}: " + "; ".join(regressions))
+    print(f"no metric regressed more than {args.threshold:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0)
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    spatial = sub.add_parser("spatial", help="SpatialHash vs linear scan for skyscraper overlap tests")
+    spatial.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    spatial.add_argument("--queries", type=int, default=200)
+    spatial.add_argument("--repeat", type=int, default=5)
+    spatial.set_defaults(run=bench_spatial)
+
+    instancing = sub.add_parser("instancing", help="per-node vs instanced skyscraper rendering frame time")
+    instancing.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    instancing.add_argument("--frames", type=int, default=30)
+    instancing.add_argument("--display", default="", help="display module to load, e.g. p3headlessgl")
+    instancing.set_defaults(run=bench_instancing)
+
+    store = sub.add_parser("store", help="dataclass records vs SkyscraperStore: memory and per-frame scan time")
+    store.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    store.add_argument("--repeat", type=int, default=20)
+    store.set_defaults(run=bench_store)
+
+    physics = sub.add_parser("physics", help="Bullet step and player collision time with and without collision groups")
+    physics.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 5000])
+    physics.add_argument("--frames", type=int, default=120)
+    physics.set_defaults(run=bench_physics)
+
+    colliders = sub.add_parser("colliders", help="a static body per building vs a compound per chunk: proxies, step, collision and rebuild time")
+    colliders.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 5000])
+    colliders.add_argument("--frames", type=int, default=120)
+    colliders.add_argument("--chunk-size", type=float, default=64)
+    colliders.set_defaults(run=bench_colliders)
+
+    city = sub.add_parser("city", help="subsystem and frame times of whole game scenes, gated against a baseline")
+    city.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    city.add_argument("--frames", type=int, default=120, help="timed calls per metric and round")
+    city.add_argument("--rounds", type=int, default=5, help="each metric keeps its best round")
+    city.add_argument("--display", default="", help="display module to load, e.g. p3headlessgl")
+    city.add_argument("--out", default="", help="JSON file to write the results to")
+    city.add_argument("--baseline", default="", help="JSON results to compare against; fails on a regression")
+    city.add_argument("--threshold", type=float, default=1.0, help="slowdown that counts as a regression, e.g. 1.0 for twice as slow")
+    city.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore slowdowns smaller than this, which are noise")
+    city.set_defaults(run=bench_city)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
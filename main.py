@@ -1,8 +1,21 @@
-from dataclasses import dataclass
-from enum import Enum
+import time
+# taken before the imports below, so the time to the menu includes them
+LAUNCHED = time.perf_counter()
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from dataclasses import dataclass, fields, replace
+from enum import Enum, IntEnum
+import heapq
+import importlib.util
 import itertools
+import json
+import math
+import queue
 import random
+import statistics
+import struct
 import sys
+import threading
 from direct.showbase.ShowBase import ShowBase
 from direct.showbase.ShowBaseGlobal import globalClock
 from direct.showbase.InputStateGlobal import inputState
@@ -10,16 +23,57 @@ from direct.fsm.FSM import FSM
 from direct.gui import DirectGuiGlobals
 from direct.gui.DirectLabel import DirectLabel
 from direct.gui.DirectButton import DirectButton
-from direct.gui.DirectWaitBar import DirectWaitBar
-from panda3d.bullet import BulletPlaneShape, BulletRigidBodyNode, BulletWorld, BulletCapsuleShape, BulletBoxShape, BulletCharacterControllerNode, BulletDebugNode, ZUp
-from panda3d.core import Vec2, Vec3, CardMaker, TextureStage, DirectionalLight, AmbientLight, WindowProperties, NodePath, TextNode, Fog, loadPrcFileData
+from panda3d.core import BitMask32, Vec2, Vec3, CardMaker, TextureStage, DirectionalLight, AmbientLight, WindowProperties, NodePath, TextNode, Fog, loadPrcFileData
+from panda3d.core import ConfigVariableBool, ConfigVariableDouble, ConfigVariableInt, ConfigVariableString, PStatCollector
+from panda3d.core import Filename, TexturePool, VirtualFileSystem, getModelPath
+from panda3d.core import Camera, GraphicsWindow, GeomEnums, LODNode, OmniBoundingVolume, OrthographicLens, PerspectiveLens, Shader, Texture
+from panda3d.core import TransformState
+from array import array
+
+
+def lazy_import(name):
+    """Returns module `name`, imported on its first attribute access rather than now."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = sys.modules[name] = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+# only games need numpy; Bullet is only imported where it's used instead,
+# since LazyLoader can't defer an extension module
+np = lazy_import("numpy")
 
 loadPrcFileData("", "win-size 1280 720")   
 loadPrcFileData("", "window-title VERTIGO")
 loadPrcFileData("", "icon-filename assets/icon.ico")
+# collide bodies by CollisionGroup pairs instead of shared mask bits
+loadPrcFileData("", "bullet-filter-algorithm groups-mask")
 
 id_counter = itertools.count()
 
+SKYSCRAPER_VARIANTS = ("a", "b", "c", "d", "e")
+BOX_MODEL = "models/box.egg"
+GROUND_TEXTURE = "assets/Textures/grid.rgb"
+
+# the building models are authored lying down; this stands them up
+SKYSCRAPER_HPR = (0, 90, 0)
+# TTL-clock seconds a skyscraper still stands once the player has touched it
+SKYSCRAPER_TTL = 5
+
+def baked_model_path(variant):
+    return f"assets/baked/building-skyscraper-{variant}.bam"
+
+def skyscraper_model_path(variant):
+    """The baked BAM for `variant` if `bake.py` has produced one, else the OBJ."""
+    baked = Filename(baked_model_path(variant))
+    if VirtualFileSystem.getGlobalPtr().resolveFilename(baked, getModelPath().getValue()):
+        return baked_model_path(variant)
+    return f"assets/building-skyscraper-{variant}.obj"
+
 class AppFSM(FSM):
     def __init__(self, app):
         super().__init__("AppFSM")
@@ -32,19 +86,44 @@ class AppFSM(FSM):
         self.menu.exit()
     
     def enterGame(self):
+        from panda3d.bullet import BulletWorld
+        # NEW GAME requests this state straight from its click handler
+        app.time_to_frame("game", time.perf_counter())
         self.game_np = NodePath("game")
         self.game_np.reparentTo(app.render)
-        self.game_scene = GameScene(BulletWorld(), self.game_np, app.loader, app.camera, app.win, app.aspect2d, self, GameSettings(), Run())
+        self.recording = None
+        seed = city_seed.getValue() if city_seed.getValue() >= 0 else None
+        if record_path.getValue():
+            self.recording = InputLog(random.getrandbits(32))
+            random.seed(self.recording.seed)
+            if city_chunks.getValue():
+                # a replay has to lay out the same city
+                if seed is None:
+                    seed = random.getrandbits(32)
+                self.recording.city_seed = seed
+        settings = GameSettings(
+            target_fps=target_fps.getValue(),
+            city_chunks=city_chunks.getValue(),
+            city_seed=seed,
+            # when chunk layouts arrive has to be part of what gets recorded
+            city_thread=self.recording is None,
+        )
+        self.game_scene = GameScene(BulletWorld(), self.game_np, app.models, app.camera, app.win, app.aspect2d, self, settings, Run(), recording=self.recording)
         app.taskMgr.add(self.game_scene.update, 'update')
 
     def exitGame(self):
-        props = WindowProperties()
-        props.setCursorHidden(False)
-        self.game_scene.hp_bar.destroy()
-        app.win.requestProperties(props)
+        if isinstance(app.win, GraphicsWindow):
+            props = WindowProperties()
+            props.setCursorHidden(False)
+            app.win.requestProperties(props)
         app.taskMgr.remove("update")
+        if self.recording is not None:
+            self.recording.finish(self.game_scene.run, self.game_scene.player_np.getPos())
+        self.game_scene.destroy()
         self.game_np.removeNode()
-        NodePath(self.game_scene.score_node).removeNode()
+        self.game_scene = self.game_np = None
+        if self.recording is not None:
+            self.recording.save(record_path.getValue())
 
     def enterHowToPlay(self):
         self.htp_scene = TextBoxScene(self, text="""Leap between the skyscrapers and survive as long as you can! 
@@ -68,6 +147,8 @@ Green - Spawn platforms beneath you while jumping.""", pos=(0, 0, 0.3))
         self.creds_scene.exit()
 
 
+GROUND_FOG_DENSITY = 0.03
+
 @dataclass
 class GameSettings:
     speed: float = 20
@@ -75,9 +156,58 @@ class GameSettings:
     gravity: float = 2*9.81
     jump_height: float = 0.7
     jump_speed: float = 10
-    mouse_sensitivity = 0.1
-    forward_force_rate = 0.0
-    ttl_decay_rate = 1
+    mouse_sensitivity: float = 0.1
+    forward_force_rate: float = 0.0
+    ttl_decay_rate: float = 1
+    # the ground fog (exp density 0.03) is ~99% opaque at 150 units, so
+    # anything past stream_radius is invisible and can be evicted
+    stream_radius: float = 250
+    stream_interval: float = 0.5
+    instanced_rendering: bool = True
+    # skyscraper LOD bands: full detail up to the first distance, then each
+    # coarser level, and nothing at all past cull_distance (deep in the fog)
+    lod_distances: tuple = (80, 130)
+    cull_distance: float = 180
+    # wall time per frame spent building queued skyscrapers (at least one is
+    # always built so the queue drains)
+    spawn_budget_ms: float = 1.0
+    # lay the city out ahead of the player in pre-generated chunks instead of
+    # growing it around each building the player lands on
+    city_chunks: bool = False
+    city_chunk_size: float = 96
+    # share of the chunk's packed slots that actually get a building
+    city_density: float = 0.4
+    # None draws one from `random`, so seeded runs stay reproducible
+    city_seed: int | None = None
+    # lay chunks out on a worker thread; off, each layout is ready on the
+    # frame it is asked for, which runs that must play out the same need
+    city_thread: bool = True
+    # group static skyscraper collision into one compound body per square
+    # chunk of this size; 0 gives every skyscraper its own body. Compounds
+    # only step faster around 10k live buildings, far more than streaming
+    # keeps, so they are off by default (see `bench.py colliders`)
+    collision_chunk_size: float = 0
+    # frame rate the quality governor steers toward; 0 leaves quality alone
+    target_fps: float = 0
+    physics_step: float = 1/120
+    max_substeps: int = 8
+
+@dataclass(frozen=True)
+class Quality:
+    """One step of the quality ladder the governor moves along."""
+    # scales stream_radius, the LOD and cull distances, and thickens the fog
+    # by the same factor so the city still fades out before it's cut off
+    view_scale: float
+    spawn_attempts: int
+    directional_light: bool
+
+QUALITY_LEVELS = (
+    Quality(view_scale=1.0, spawn_attempts=7, directional_light=True),
+    Quality(view_scale=0.8, spawn_attempts=7, directional_light=True),
+    Quality(view_scale=0.8, spawn_attempts=5, directional_light=True),
+    Quality(view_scale=0.65, spawn_attempts=5, directional_light=False),
+    Quality(view_scale=0.5, spawn_attempts=4, directional_light=False),
+)
 
 @dataclass
 class Run:
@@ -87,21 +217,88 @@ class Run:
     feather_fall_remaining: int = 1
     hp: int = 100
     last_ground_height: float = 0.0
+    survival_time: float = 0.0
 
 class PowerupTypes(Enum):
     PLAT_MAKE = "PLAT_MAKE"
     FEATHER_FALL = "FEATHER_FALL"
     HEAL = "HEAL"
 
-@dataclass
+class ColliderKind(IntEnum):
+    GROUND = 0
+    SKYSCRAPER = 1
+    POWERUP = 2
+    PLATFORM = 3
+    # a compound of skyscrapers; the contact's child index says which one
+    CHUNK = 4
+
+class CollisionGroup(IntEnum):
+    """Bullet filter groups. Only the pairs enabled in
+    GameScene.setup_collisions ever reach the broadphase pair cache: the
+    player against static bodies and the player's sensor against powerups."""
+    PLAYER = 0
+    STATIC = 1
+    POWERUP = 2
+    SENSOR = 3
+
+    @property
+    def mask(self):
+        return BitMask32.bit(self)
+
 class Skyscraper:
+    """View of one building's row in a SkyscraperStore.
+
+    Only valid while the building is alive: its slot is reused by the next
+    building added after it is removed, so hold on to the id instead.
+    """
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store, slot):
+        self.store = store
+        self.slot = slot
+
+    @property
+    def id(self) -> int:
+        return int(self.store.ids[self.slot])
+
+    @property
+    def pos(self) -> Vec2:
+        return Vec2(*self.store.pos[self.slot])
+
+    @property
+    def scale(self) -> Vec3:
+        return Vec3(*self.store.scale[self.slot])
+
+    @property
+    def timer_triggered(self) -> bool:
+        return bool(self.store.flags[self.slot] & SkyscraperStore.TRIGGERED)
+
+    @timer_triggered.setter
+    def timer_triggered(self, value: bool):
+        if value:
+            self.store.flags[self.slot] |= SkyscraperStore.TRIGGERED
+        else:
+            self.store.flags[self.slot] &= ~SkyscraperStore.TRIGGERED
+
+    @property
+    def node_path(self) -> NodePath:
+        return self.store.node_paths[self.slot]
+
+    @property
+    def model(self) -> NodePath:
+        return self.store.models[self.slot]
+
+    @property
+    def powerup(self) -> PowerupTypes | None:
+        return self.store.powerups[self.slot]
+
+@dataclass
+class SpawnJob:
+    """A skyscraper whose layout is decided but whose nodes aren't built yet."""
     id: int
-    node_path: NodePath
-    pos: Vec2
+    pos: Vec3
     scale: Vec3
-    ttl: int
-    model: NodePath
-    timer_triggered: bool = False
+    model_path: str
     powerup: PowerupTypes | None = None
 
 @dataclass
@@ -112,6 +309,1025 @@ class Platform:
     ttl: int
     model: NodePath
 
+class ModelRegistry:
+    """Loads every model once and hands out instances of the cached prototype.
+
+    Tight bounds are cached per model path the first time they are asked for,
+    so spawning after warm-up does neither disk I/O nor a bounds walk. Models
+    baked by `bake.py` carry their extents in an "extents" tag, which seeds
+    the cache without walking the geometry at all.
+    """
+    def __init__(self, loader):
+        self.loader = loader
+        self.prototypes = {}
+        self.pending = {}
+        self.extents_cache = {}
+        self.load_hits = 0
+        self.load_misses = 0
+        self.bounds_hits = 0
+        self.bounds_misses = 0
+
+    def preload(self, paths):
+        for path in paths:
+            self.prototype(path)
+
+    def prototype(self, path):
+        proto = self.prototypes.get(path)
+        if proto is None:
+            proto = self.store(path, self.loader.loadModel(path))
+        else:
+            self.load_hits += 1
+        return proto
+
+    def store(self, path, proto):
+        self.load_misses += 1
+        self.prototypes[path] = proto
+        if proto.hasTag("extents"):
+            self.extents_cache[path] = Vec3(*map(float, proto.getTag("extents").split()))
+        return proto
+
+    def is_loaded(self, path):
+        return path in self.prototypes
+
+    def load_async(self, path, callback):
+        """Calls `callback()` once `path` is loaded, loading it on Panda's
+        async loader thread if it isn't yet."""
+        if path in self.prototypes:
+            callback()
+            return
+        waiters = self.pending.get(path)
+        if waiters is None:
+            waiters = self.pending[path] = []
+            self.loader.loadModel(path, callback=lambda model: self.loaded(path, model))
+        waiters.append(callback)
+
+    def loaded(self, path, model):
+        if path not in self.prototypes:
+            self.store(path, model)
+        for callback in self.pending.pop(path, ()):
+            callback()
+
+    def instance(self, path):
+        holder = NodePath("model")
+        holder.setTag("model", path)
+        self.prototype(path).instanceTo(holder)
+        return holder
+
+    def extents(self, model: NodePath):
+        path = model.getTag("model")
+        extents = self.extents_cache.get(path)
+        if extents is None:
+            self.bounds_misses += 1
+            bounds = model.getTightBounds()
+            extents = Vec3(
+                abs(bounds[1].x - bounds[0].x),
+                abs(bounds[1].y - bounds[0].y),
+                abs(bounds[1].z - bounds[0].z),
+            )
+            self.extents_cache[path] = extents
+        else:
+            self.bounds_hits += 1
+        return extents
+
+    def stats(self):
+        return {
+            "load_hits": self.load_hits,
+            "load_misses": self.load_misses,
+            "bounds_hits": self.bounds_hits,
+            "bounds_misses": self.bounds_misses,
+        }
+
+
+class SpatialHash:
+    """Uniform grid over skyscraper footprints keyed by integer cell coords.
+
+    Each footprint is registered in every cell it overlaps, so overlap
+    queries only look at the handful of cells around the query.
+    """
+    def __init__(self, cell_size=32.0):
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)
+        self.footprints = {}
+
+    def __len__(self):
+        return len(self.footprints)
+
+    def cell_range(self, x0, y0, x1, y1):
+        cs = self.cell_size
+        for cx in range(int(x0 // cs), int(x1 // cs) + 1):
+            for cy in range(int(y0 // cs), int(y1 // cs) + 1):
+                yield cx, cy
+
+    def insert(self, id, pos, scale):
+        footprint = (pos.x, pos.y, scale.x, scale.y)
+        self.footprints[id] = footprint
+        for cell in self.cell_range(*self.bounds(footprint)):
+            self.cells[cell].add(id)
+
+    def remove(self, id):
+        footprint = self.footprints.pop(id, None)
+        if footprint is None:
+            return
+        for cell in self.cell_range(*self.bounds(footprint)):
+            bucket = self.cells[cell]
+            bucket.discard(id)
+            if not bucket:
+                del self.cells[cell]
+
+    @staticmethod
+    def bounds(footprint):
+        x, y, sx, sy = footprint
+        return x - sx/2, y - sy/2, x + sx/2, y + sy/2
+
+    def intersects(self, pos, scale):
+        seen = set()
+        for cell in self.cell_range(pos.x - scale.x/2, pos.y - scale.y/2, pos.x + scale.x/2, pos.y + scale.y/2):
+            for id in self.cells.get(cell, ()):
+                if id in seen:
+                    continue
+                seen.add(id)
+                ox, oy, osx, osy = self.footprints[id]
+                if (abs(pos.x - ox) * 2 < (scale.x + osx) and
+                    abs(pos.y - oy) * 2 < (scale.y + osy)):
+                    return True
+        return False
+
+
+class ExpiryQueue:
+    """Min-heap of items keyed on the TTL clock value at which they expire.
+
+    The clock advances by the decayed amount each frame, so the per-frame
+    cost depends only on how many items actually expire.
+    """
+    def __init__(self):
+        self.clock = 0.0
+        self.heap = []
+        self.seq = itertools.count()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, ttl, item):
+        heapq.heappush(self.heap, (self.clock + ttl, next(self.seq), item))
+
+    def advance(self, decay):
+        self.clock += decay
+        expired = []
+        while self.heap and self.heap[0][0] <= self.clock:
+            expired.append(heapq.heappop(self.heap)[2])
+        return expired
+
+
+class SkyscraperStore:
+    """Struct-of-arrays storage for the live skyscrapers.
+
+    Ids, footprints, heights and flags sit in parallel NumPy arrays
+    indexed by slot, with the scene graph handles in plain lists alongside.
+    Removed slots go on a free-list and the arrays double when it runs out,
+    so adding and removing never reallocates in steady state. Lookups by id
+    behave like the dict this replaces and hand out `Skyscraper` views;
+    scans over every building (streaming, LOD) are single array operations.
+    """
+    ALIVE = 1
+    TRIGGERED = 2
+
+    def __init__(self, capacity=64):
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.scale = np.zeros((capacity, 3), dtype=np.float32)
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+        self.node_paths = [None] * capacity
+        self.models = [None] * capacity
+        self.powerups = [None] * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+        self.slot_of = {}
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    def __contains__(self, id):
+        return id in self.slot_of
+
+    def __iter__(self):
+        return iter(self.slot_of)
+
+    def __getitem__(self, id) -> Skyscraper:
+        return Skyscraper(self, self.slot_of[id])
+
+    def get(self, id, default=None):
+        slot = self.slot_of.get(id)
+        return default if slot is None else Skyscraper(self, slot)
+
+    def keys(self):
+        return self.slot_of.keys()
+
+    def values(self):
+        return (Skyscraper(self, slot) for slot in self.slot_of.values())
+
+    def grow(self):
+        capacity = len(self.ids)
+        self.ids = np.concatenate([self.ids, np.full(capacity, -1, dtype=np.int64)])
+        self.pos = np.concatenate([self.pos, np.zeros_like(self.pos)])
+        self.scale = np.concatenate([self.scale, np.zeros_like(self.scale)])
+        self.flags = np.concatenate([self.flags, np.zeros_like(self.flags)])
+        for column in (self.node_paths, self.models, self.powerups):
+            column.extend([None] * capacity)
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def add(self, id, node_path, pos, scale, model, powerup=None) -> Skyscraper:
+        if not self.free:
+            self.grow()
+        slot = self.free.pop()
+        self.slot_of[id] = slot
+        self.ids[slot] = id
+        self.pos[slot] = (pos.x, pos.y)
+        self.scale[slot] = scale
+        self.flags[slot] = self.ALIVE
+        self.node_paths[slot] = node_path
+        self.models[slot] = model
+        self.powerups[slot] = powerup
+        return Skyscraper(self, slot)
+
+    def remove(self, id):
+        slot = self.slot_of.pop(id, None)
+        if slot is None:
+            return False
+        self.ids[slot] = -1
+        self.flags[slot] = 0
+        self.node_paths[slot] = self.models[slot] = self.powerups[slot] = None
+        self.free.append(slot)
+        return True
+
+    def alive(self):
+        return np.flatnonzero(self.flags & self.ALIVE)
+
+    def outside(self, center, radius):
+        """Ids of every building whose footprint stays farther than `radius` from `center`."""
+        slots = self.alive()
+        half = self.scale[slots, :2] / 2
+        pos = self.pos[slots]
+        nearest = np.clip((center.x, center.y), pos - half, pos + half)
+        far = ((nearest - (center.x, center.y)) ** 2).sum(axis=1) > radius ** 2
+        return self.ids[slots[far]].tolist()
+
+    def mid_distances(self, center):
+        """Ids of the live buildings and the distance from `center` to the middle of each."""
+        slots = self.alive()
+        mids = np.column_stack([self.pos[slots], self.scale[slots, 2] / 2])
+        return self.ids[slots].tolist(), np.linalg.norm(mids - tuple(center), axis=1).tolist()
+
+
+class CityGenerator:
+    """Lays out whole chunks of city on a background thread.
+
+    A chunk is packed in rows, left to right, with the same footprint,
+    height, gap and powerup rolls `spawn_neighbours` uses, so nothing is
+    ever rejected for overlapping. Every chunk draws from its own RNG seeded
+    with the city seed and the chunk coords: a seed always produces the same
+    city, whatever order the chunks are asked for in. The main thread only
+    requests chunks and collects the finished layouts with `poll`; once a
+    chunk's buildings have all been streamed out it is released, and asking
+    for it again lays out the same buildings.
+    """
+    # buildings keep at least half the smallest gap from the chunk edge
+    MARGIN = 2.5
+
+    def __init__(self, seed, settings: GameSettings, threaded=True):
+        self.seed = seed
+        self.settings = settings
+        self.requested = set()
+        self.requests = queue.Queue()
+        self.ready = queue.Queue()
+        self.thread = None
+        if threaded:
+            self.thread = threading.Thread(target=self.work, name="city-generator", daemon=True)
+            self.thread.start()
+
+    def request(self, chunk):
+        if chunk in self.requested:
+            return
+        self.requested.add(chunk)
+        if self.thread is None:
+            self.ready.put((chunk, self.generate(chunk)))
+        else:
+            self.requests.put(chunk)
+
+    def release(self, chunk):
+        self.requested.discard(chunk)
+
+    def work(self):
+        while (chunk := self.requests.get()) is not None:
+            self.ready.put((chunk, self.generate(chunk)))
+
+    def poll(self):
+        done = []
+        while True:
+            try:
+                done.append(self.ready.get_nowait())
+            except queue.Empty:
+                return done
+
+    def generate(self, chunk):
+        """(x, y, sx, sy, sz, variant, powerup) for every building in `chunk`."""
+        rng = random.Random(f"{self.seed}:{chunk[0]}:{chunk[1]}")
+        size = self.settings.city_chunk_size
+        x0, y0 = chunk[0] * size + self.MARGIN, chunk[1] * size + self.MARGIN
+        x1, y1 = x0 + size - 2 * self.MARGIN, y0 + size - 2 * self.MARGIN
+        layout = []
+        # rows are as deep as the deepest footprint; each building is
+        # jittered inside its row
+        y = y0
+        while y + 12 <= y1:
+            x = x0
+            while True:
+                sx = rng.randint(5, 12)
+                if x + sx > x1:
+                    break
+                sy = rng.randint(5, 12)
+                sz = rng.randint(1, 4) * 10
+                py = y + sy/2 + rng.uniform(0, 12 - sy)
+                variant = rng.choice(SKYSCRAPER_VARIANTS)
+                powerup = rng.choice([None, *PowerupTypes])
+                if rng.random() < self.settings.city_density:
+                    layout.append((x + sx/2, py, sx, sy, sz, variant, powerup))
+                x += sx + rng.randint(5, 10)
+            y += 12 + rng.randint(5, 10)
+        return layout
+
+    def chunks_within(self, center, radius):
+        """Chunks lying entirely within `radius` of `center`, nearest first."""
+        size = self.settings.city_chunk_size
+        found = []
+        for cx in range(math.floor((center.x - radius) / size), math.floor((center.x + radius) / size) + 1):
+            for cy in range(math.floor((center.y - radius) / size), math.floor((center.y + radius) / size) + 1):
+                fx = max(abs(cx * size - center.x), abs((cx + 1) * size - center.x))
+                fy = max(abs(cy * size - center.y), abs((cy + 1) * size - center.y))
+                if fx**2 + fy**2 <= radius**2:
+                    mx, my = (cx + 0.5) * size - center.x, (cy + 0.5) * size - center.y
+                    found.append((mx**2 + my**2, (cx, cy)))
+        return [chunk for _, chunk in sorted(found)]
+
+    def stop(self):
+        if self.thread is not None:
+            self.requests.put(None)
+            self.thread.join()
+            self.thread = None
+
+
+class BodyPool:
+    """Recycles static Bullet bodies and their NodePaths per kind.
+
+    Released bodies are detached from the scene graph and kept with their
+    children, so a platform or powerup comes back with its model already
+    attached. Box shapes are shared between every body with the same half
+    extents. Callers still attach and remove the bodies from the world.
+    """
+    def __init__(self, max_free=256):
+        self.max_free = max_free
+        self.shapes = {}
+        self.free = defaultdict(list)
+        self.live = defaultdict(int)
+        self.acquired = 0
+        self.reused = 0
+
+    def box_shape(self, half_extents):
+        key = tuple(half_extents)
+        shape = self.shapes.get(key)
+        if shape is None:
+            from panda3d.bullet import BulletBoxShape
+            shape = self.shapes[key] = BulletBoxShape(Vec3(*key))
+        return shape
+
+    def acquire(self, kind, name, parent):
+        self.acquired += 1
+        self.live[kind] += 1
+        free = self.free[kind]
+        if free:
+            self.reused += 1
+            body_np = free.pop()
+            body_np.node().setName(name)
+        else:
+            from panda3d.bullet import BulletRigidBodyNode
+            body_np = NodePath(BulletRigidBodyNode(name))
+            body_np.node().setMass(0)
+        body_np.reparentTo(parent)
+        return body_np
+
+    def set_box(self, body_np, half_extents):
+        node = body_np.node()
+        shape = self.box_shape(half_extents)
+        if node.getNumShapes():
+            if node.getShape(0) == shape:
+                return
+            node.removeShape(node.getShape(0))
+        node.addShape(shape)
+
+    def release(self, kind, body_np):
+        self.live[kind] -= 1
+        body_np.detachNode()
+        if len(self.free[kind]) < self.max_free:
+            self.free[kind].append(body_np)
+
+    def stats(self):
+        return {
+            "live": dict(self.live),
+            "free": {kind: len(free) for kind, free in self.free.items()},
+            "shapes": len(self.shapes),
+            "acquired": self.acquired,
+            "reuse_rate": self.reused / self.acquired if self.acquired else 0.0,
+        }
+
+
+class BodyColliders:
+    """One static box body per skyscraper, riding on its node."""
+    def __init__(self, world, pool: BodyPool):
+        self.world = world
+        self.pool = pool
+        self.bodies = {}
+
+    def add(self, ss):
+        body_np = self.pool.acquire("skyscraper", f"Skyscraper#{ss.id}", ss.node_path)
+        node = body_np.node()
+        node.setPythonTag("collider", (ColliderKind.SKYSCRAPER, ss.id))
+        node.setIntoCollideMask(CollisionGroup.STATIC.mask)
+        self.pool.set_box(body_np, ss.scale*0.5)
+        self.world.attachRigidBody(node)
+        self.bodies[ss.id] = body_np
+
+    def remove(self, ss):
+        body_np = self.bodies.pop(ss.id)
+        self.world.remove(body_np.node())
+        self.pool.release("skyscraper", body_np)
+
+    @property
+    def proxies(self):
+        return len(self.bodies)
+
+
+class ChunkedColliders:
+    """Static skyscraper collision as one compound body per grid chunk.
+
+    The broadphase then carries a proxy per chunk rather than per building,
+    and Bullet sorts out which child boxes the player touches inside the
+    compound. Each building gets its own box shape, because a compound drops
+    every child sharing the shape it is asked to remove. Removing a child
+    moves the last one into its slot, in Bullet and in the body's shape
+    list alike, and each chunk's list of ids is kept in the same order, so
+    a contact's child index maps straight back to the skyscraper.
+    """
+    def __init__(self, world, parent, chunk_size):
+        self.world = world
+        self.parent = parent
+        self.chunk_size = chunk_size
+        # chunk coords -> (body, skyscraper id of each child shape)
+        self.chunks = {}
+        # skyscraper id -> (chunk coords, its child shape)
+        self.children = {}
+
+    def chunk_of(self, pos):
+        cs = self.chunk_size
+        return int(pos.x // cs), int(pos.y // cs)
+
+    def add(self, ss):
+        from panda3d.bullet import BulletBoxShape
+        chunk = self.chunk_of(ss.pos)
+        entry = self.chunks.get(chunk)
+        if entry is None:
+            from panda3d.bullet import BulletRigidBodyNode
+            node = BulletRigidBodyNode(f"Chunk{chunk}")
+            node.setMass(0)
+            node.setPythonTag("collider", (ColliderKind.CHUNK, chunk))
+            node.setIntoCollideMask(CollisionGroup.STATIC.mask)
+            self.parent.attachNewNode(node)
+            entry = self.chunks[chunk] = (node, [])
+        node, ids = entry
+        shape = BulletBoxShape(ss.scale*0.5)
+        node.addShape(shape, TransformState.makePos(Vec3(ss.pos.x, ss.pos.y, ss.scale.z/2)))
+        ids.append(ss.id)
+        self.children[ss.id] = (chunk, shape)
+        if len(ids) == 1:
+            self.world.attachRigidBody(node)
+
+    def remove(self, ss):
+        chunk, shape = self.children.pop(ss.id)
+        node, ids = self.chunks[chunk]
+        if len(ids) == 1:
+            self.world.remove(node)
+            NodePath(node).removeNode()
+            del self.chunks[chunk]
+            return
+        index = ids.index(ss.id)
+        ids[index] = ids[-1]
+        ids.pop()
+        node.removeShape(shape)
+
+    def skyscraper_at(self, chunk, index):
+        return self.chunks[chunk][1][index]
+
+    @property
+    def proxies(self):
+        return len(self.chunks)
+
+
+def lod_levels(proto: NodePath):
+    """The meshes of a skyscraper prototype, most detailed first.
+
+    Baked models hold one child per level under an LODNode; plain OBJ
+    prototypes are a single level.
+    """
+    lod = proto.find("**/+LODNode")
+    if lod.isEmpty():
+        return [proto]
+    return list(lod.getChildren())
+
+def lod_edges(n_levels, settings: GameSettings):
+    """Distance band boundaries for `n_levels` levels, ending at the cull distance."""
+    inner = [d for d in settings.lod_distances[:n_levels - 1] if d < settings.cull_distance]
+    return [0, *inner, settings.cull_distance]
+
+def lod_level(distance, edges):
+    for level in range(len(edges) - 1):
+        if distance < edges[level + 1]:
+            return level
+    return None
+
+def count_triangles(root: NodePath):
+    total = 0
+    for gnp in root.findAllMatches("**/+GeomNode"):
+        for geom in gnp.node().getGeoms():
+            for prim in geom.getPrimitives():
+                total += prim.decompose().getNumPrimitives()
+    return total
+
+
+class NodeSkyscrapers:
+    """Fallback renderer: each skyscraper draws its own scaled model copy.
+
+    Every variant prototype gets an LODNode (plain OBJ prototypes are wrapped
+    in a single-level one) whose last switch culls it past cull_distance.
+    Since all copies instance the prototype, configuring it once is enough.
+    """
+    def __init__(self, models: ModelRegistry, settings: GameSettings):
+        self.models = models
+        self.settings = settings
+        self.level_triangles = {}
+        self.paths = {}
+        self.triangles = 0
+
+    def configure(self, path):
+        proto = self.models.prototype(path)
+        lod_np = proto.find("**/+LODNode")
+        if lod_np.isEmpty():
+            lod_np = NodePath(LODNode("lod"))
+            level = lod_np.attachNewNode("lod0")
+            for child in proto.getChildren():
+                child.reparentTo(level)
+            lod_np.reparentTo(proto)
+        lod = lod_np.node()
+        levels = lod_levels(proto)
+        # measure from the middle of the building, not its base
+        lo, hi = levels[0].getTightBounds(lod_np)
+        lod.setCenter((lo + hi) / 2)
+        edges = lod_edges(len(levels), self.settings)
+        lod.clearSwitches()
+        for level in range(len(levels)):
+            if level < len(edges) - 1:
+                lod.addSwitch(edges[level + 1], edges[level])
+            else:
+                lod.addSwitch(0, 0)
+        self.level_triangles[path] = [count_triangles(level) for level in levels]
+
+    def add(self, ss):
+        path = ss.model.getTag("model")
+        if path not in self.level_triangles:
+            self.configure(path)
+        self.paths[ss.id] = path
+        bx, by, bz = self.models.extents(ss.model)
+        ss.model.setScale(ss.scale.x/bx, ss.scale.z/bz, ss.scale.y/by)
+        ss.model.reparentTo(ss.node_path)
+        ss.model.setPos(0, 0, -ss.scale.z/2)
+
+    def remove(self, ss):
+        del self.paths[ss.id]
+        ss.model.removeNode()
+
+    def set_settings(self, settings: GameSettings):
+        self.settings = settings
+        for path in self.level_triangles:
+            self.configure(path)
+
+    def update_lod(self, center, skyscrapers: SkyscraperStore):
+        # the LODNodes switch on their own; this only keeps the triangle estimate
+        total = 0
+        for id, distance in zip(*skyscrapers.mid_distances(center)):
+            tris = self.level_triangles[self.paths[id]]
+            level = lod_level(distance, lod_edges(len(tris), self.settings))
+            if level is not None:
+                total += tris[level]
+        self.triangles = total
+
+    def flush(self):
+        pass
+
+    def destroy(self):
+        pass
+
+
+INSTANCED_VERT = """
+#version 150
+
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform mat4 p3d_ModelViewMatrix;
+uniform mat3 p3d_NormalMatrix;
+uniform samplerBuffer instances;
+
+in vec4 p3d_Vertex;
+in vec3 p3d_Normal;
+in vec2 p3d_MultiTexCoord0;
+
+out vec2 texcoord;
+out vec3 normal;
+out vec3 eye_pos;
+
+void main() {
+    vec3 offset = texelFetch(instances, gl_InstanceID * 2).xyz;
+    vec3 scale = texelFetch(instances, gl_InstanceID * 2 + 1).xyz;
+    vec4 pos = vec4(p3d_Vertex.xyz * scale + offset, 1.0);
+    gl_Position = p3d_ModelViewProjectionMatrix * pos;
+    eye_pos = (p3d_ModelViewMatrix * pos).xyz;
+    normal = normalize(p3d_NormalMatrix * (p3d_Normal / scale));
+    texcoord = p3d_MultiTexCoord0;
+}
+"""
+
+INSTANCED_FRAG = """
+#version 150
+
+uniform sampler2D p3d_Texture0;
+uniform vec4 p3d_ColorScale;
+uniform struct {
+    vec4 ambient;
+} p3d_LightModel;
+uniform struct {
+    vec4 color;
+    vec4 position;
+} p3d_LightSource[2];
+uniform struct {
+    vec4 color;
+    float density;
+} p3d_Fog;
+
+in vec2 texcoord;
+in vec3 normal;
+in vec3 eye_pos;
+
+out vec4 frag_color;
+
+void main() {
+    vec3 n = normalize(normal);
+    vec3 light = p3d_LightModel.ambient.rgb;
+    for (int i = 0; i < p3d_LightSource.length(); ++i) {
+        // directional lights only; w == 0 means xyz is the direction towards the light
+        light += p3d_LightSource[i].color.rgb * max(dot(n, normalize(p3d_LightSource[i].position.xyz)), 0.0);
+    }
+    vec4 color = texture(p3d_Texture0, texcoord) * p3d_ColorScale;
+    color.rgb *= light;
+    float fog = clamp(exp(-p3d_Fog.density * length(eye_pos)), 0.0, 1.0);
+    frag_color = vec4(mix(p3d_Fog.color.rgb, color.rgb, fog), color.a);
+}
+"""
+
+
+class InstanceBatch:
+    """All skyscrapers of one variant and LOD level, drawn with a single instanced call.
+
+    Slot i of the buffer texture holds instance i's offset and scale as two
+    RGBA32F texels; removal swaps the last slot in so the array stays dense.
+    """
+    def __init__(self, name, mesh: NodePath, parent, shader, capacity=64):
+        self.np = mesh.copyTo(parent)
+        self.np.setHpr(*SKYSCRAPER_HPR)
+        self.np.flattenStrong()
+        self.np.node().setBounds(OmniBoundingVolume())
+        self.np.node().setFinal(True)
+        self.np.setShader(shader)
+        self.np.hide()
+        self.mesh_triangles = count_triangles(self.np)
+        self.ids = []
+        self.slot_of = {}
+        self.texture = Texture(f"instances-{name}")
+        self.resize(capacity)
+        self.dirty = False
+
+    def resize(self, capacity):
+        self.capacity = capacity
+        data = array("f", bytes(capacity * 8 * 4))
+        if self.ids:
+            data[:len(self.ids) * 8] = self.data[:len(self.ids) * 8]
+        self.data = data
+        self.texture.setupBufferTexture(capacity * 2, Texture.T_float, Texture.F_rgba32, GeomEnums.UH_dynamic)
+        self.np.setShaderInput("instances", self.texture)
+
+    def add(self, id, offset, scale):
+        if len(self.ids) == self.capacity:
+            self.resize(self.capacity * 2)
+        slot = len(self.ids)
+        self.ids.append(id)
+        self.slot_of[id] = slot
+        self.data[slot * 8:slot * 8 + 8] = array("f", (*offset, 0, *scale, 0))
+        self.dirty = True
+
+    def remove(self, id):
+        slot = self.slot_of.pop(id)
+        last = len(self.ids) - 1
+        if slot != last:
+            moved = self.ids[last]
+            self.ids[slot] = moved
+            self.slot_of[moved] = slot
+            self.data[slot * 8:slot * 8 + 8] = self.data[last * 8:last * 8 + 8]
+        self.ids.pop()
+        self.dirty = True
+
+    def flush(self):
+        if not self.dirty:
+            return
+        self.dirty = False
+        self.texture.setRamImage(self.data.tobytes())
+        if self.ids:
+            self.np.setInstanceCount(len(self.ids))
+            self.np.show()
+        else:
+            self.np.hide()
+
+
+class InstancedSkyscrapers:
+    """Renderer that draws each skyscraper variant and LOD level with one instanced call.
+
+    LOD selection happens on the CPU in update_lod: each building is moved
+    to the batch of the level its distance falls in, or dropped from all
+    batches past cull_distance.
+    """
+    def __init__(self, models: ModelRegistry, parent, settings: GameSettings):
+        self.models = models
+        self.parent = parent
+        self.settings = settings
+        self.shader = Shader.make(Shader.SL_GLSL, vertex=INSTANCED_VERT, fragment=INSTANCED_FRAG)
+        self.batches = {}
+        self.placed = {}
+        self.center = Vec3(0, 0, 0)
+        self.triangles = 0
+
+    @staticmethod
+    def supported(win):
+        if win is None or win.getGsg() is None:
+            return False
+        gsg = win.getGsg()
+        return gsg.getSupportsBufferTexture() and gsg.getSupportsGeometryInstancing() and gsg.getSupportsGlsl()
+
+    def levels(self, path):
+        batches = self.batches.get(path)
+        if batches is None:
+            meshes = lod_levels(self.models.prototype(path))
+            batches = self.batches[path] = [
+                InstanceBatch(f"{path}-lod{level}", mesh, self.parent, self.shader)
+                for level, mesh in enumerate(meshes)
+            ]
+        return batches
+
+    def place(self, id, level):
+        path, offset, scale, old = self.placed[id]
+        if level == old:
+            return
+        batches = self.levels(path)
+        if old is not None:
+            batches[old].remove(id)
+        if level is not None:
+            batches[level].add(id, offset, scale)
+        self.placed[id] = (path, offset, scale, level)
+
+    def level_for(self, path, distance):
+        return lod_level(distance, lod_edges(len(self.levels(path)), self.settings))
+
+    def add(self, ss):
+        path = ss.model.getTag("model")
+        bx, by, bz = self.models.extents(ss.model)
+        offset = (ss.pos.x, ss.pos.y, 0)
+        self.placed[ss.id] = (path, offset, (ss.scale.x/bx, ss.scale.y/by, ss.scale.z/bz), None)
+        mid = Vec3(ss.pos.x, ss.pos.y, ss.scale.z/2)
+        self.place(ss.id, self.level_for(path, (mid - self.center).length()))
+
+    def remove(self, ss):
+        self.place(ss.id, None)
+        del self.placed[ss.id]
+        ss.model.removeNode()
+
+    def set_settings(self, settings: GameSettings):
+        # buildings move to their new levels on the next update_lod
+        self.settings = settings
+
+    def update_lod(self, center, skyscrapers: SkyscraperStore):
+        self.center = Vec3(center)
+        for id, distance in zip(*skyscrapers.mid_distances(center)):
+            self.place(id, self.level_for(self.placed[id][0], distance))
+
+    def flush(self):
+        triangles = 0
+        for batches in self.batches.values():
+            for batch in batches:
+                batch.flush()
+                triangles += batch.mesh_triangles * len(batch.ids)
+        self.triangles = triangles
+
+    def destroy(self):
+        for batches in self.batches.values():
+            for batch in batches:
+                batch.np.removeNode()
+
+
+profile_frames = ConfigVariableBool("vertigo-profile", False, "Time every GameScene.update stage and report percentiles")
+profile_trace = ConfigVariableString("vertigo-profile-trace", "", "JSON-lines file to write one record per profiled frame to")
+record_path = ConfigVariableString("vertigo-record", "", "File to save each game's input log to, for replay.py")
+target_fps = ConfigVariableDouble("vertigo-target-fps", 60, "Frame rate the quality governor aims for; 0 turns it off")
+city_chunks = ConfigVariableBool("vertigo-city-chunks", False, "Lay the city out in pre-generated chunks ahead of the player")
+city_seed = ConfigVariableInt("vertigo-city-seed", -1, "Seed for the chunked city layout; -1 draws a new one each game")
+startup_timing = ConfigVariableBool("vertigo-startup-timing", False, "Print how long the menu and each game's first frame take to show up")
+
+
+class QualityGovernor:
+    """Walks the QUALITY_LEVELS ladder to keep frames within a time budget.
+
+    Every `window` seconds it compares the median frame time of the window
+    against the budget, so a single hitch doesn't count: more than `slack`
+    over steps one level down. Stepping back up takes `calm` windows in a
+    row within budget, since with vsync on frames never come in under the
+    refresh interval however light they are; a window under `headroom` of
+    the budget counts for all of them. A step up that the very next window
+    undoes doubles the wait before the next try, so a level that can't hold
+    the budget isn't retried every few seconds. Each change is printed with
+    the knobs it turned and kept in `decisions`.
+    """
+    def __init__(self, target_fps, window=1.0, slack=1.1, headroom=0.7, calm=5):
+        self.budget = 1 / target_fps
+        self.window = window
+        self.slack = slack
+        self.headroom = headroom
+        self.calm = calm
+        self.wait = calm
+        self.level = 0
+        self.elapsed = 0.0
+        self.frame_times = []
+        self.within_budget = 0
+        self.raised = False
+        self.decisions = []
+
+    def update(self, frame_dt, now):
+        self.elapsed += frame_dt
+        self.frame_times.append(frame_dt)
+        if self.elapsed < self.window:
+            return self.level
+        median = statistics.median(self.frame_times)
+        self.elapsed = 0.0
+        self.frame_times.clear()
+        level = self.level
+        if median > self.budget * self.slack:
+            if self.raised:
+                self.wait *= 2
+            self.within_budget = 0
+            level = min(level + 1, len(QUALITY_LEVELS) - 1)
+        else:
+            if self.raised:
+                self.wait = self.calm
+            self.within_budget += self.calm if median < self.budget * self.headroom else 1
+            if self.within_budget >= self.wait:
+                level = max(level - 1, 0)
+        self.raised = level < self.level
+        if level != self.level:
+            self.within_budget = 0
+            self.decide(level, median, now)
+        return self.level
+
+    def decide(self, level, median, now):
+        old, new = QUALITY_LEVELS[self.level], QUALITY_LEVELS[level]
+        knobs = ", ".join(
+            f"{f.name} {getattr(old, f.name)} -> {getattr(new, f.name)}"
+            for f in fields(Quality) if getattr(old, f.name) != getattr(new, f.name)
+        )
+        print(f"quality {self.level} -> {level} at {now:.1f}s "
+              f"(frames {median * 1e3:.1f} ms, budget {self.budget * 1e3:.1f} ms): {knobs}")
+        self.decisions.append((now, self.level, level, median))
+        self.level = level
+
+
+class StageTimer:
+    __slots__ = ("profiler", "name", "collector", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.collector = PStatCollector(f"App:Show code:GameScene:{name}")
+
+    def __enter__(self):
+        self.collector.start()
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter_ns() - self.start
+        self.collector.stop()
+        frame = self.profiler.frame
+        frame[self.name] = frame.get(self.name, 0) + elapsed
+
+
+class FrameProfiler:
+    """Times each GameScene.update stage and keeps rolling percentiles.
+
+    Stage timings also go to PStats collectors, and counters to PStats
+    levels, so `pstats` shows them next to Panda's own. Totals passed to
+    end_frame are cumulative and are turned into per-frame deltas.
+    """
+    def __init__(self, trace_path="", window=1000):
+        self.timers = {}
+        self.frame = {}
+        self.counts = {}
+        self.last_totals = {}
+        self.history = defaultdict(lambda: deque(maxlen=window))
+        self.level_collectors = {}
+        self.frame_no = 0
+        self.trace = open(trace_path, "w") if trace_path else None
+
+    def stage(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = StageTimer(self, name)
+        return timer
+
+    def count(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def end_frame(self, totals, levels):
+        for name, total in totals.items():
+            self.count(name, total - self.last_totals.get(name, total))
+            self.last_totals[name] = total
+        levels = {**self.counts, **levels}
+        for name, value in levels.items():
+            collector = self.level_collectors.get(name)
+            if collector is None:
+                collector = self.level_collectors[name] = PStatCollector(f"Vertigo:{name}")
+            collector.setLevel(value)
+        stages_ms = {name: ns / 1e6 for name, ns in self.frame.items()}
+        stages_ms["total"] = sum(stages_ms.values())
+        for name, ms in stages_ms.items():
+            self.history[name].append(ms)
+        for name, value in levels.items():
+            self.history[name].append(value)
+        if self.trace is not None:
+            self.trace.write(json.dumps({"frame": self.frame_no, "stages_ms": stages_ms, "counts": levels}) + "\n")
+        self.frame_no += 1
+        self.frame = {}
+        # keep every counter seen so far so quiet frames record a zero
+        self.counts = dict.fromkeys(self.counts, 0)
+
+    def percentiles(self):
+        result = {}
+        for name, samples in self.history.items():
+            ordered = sorted(samples)
+            pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+            result[name] = {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+        return result
+
+    def report(self):
+        lines = [f"{'stage / counter':<28}{'p50':>10}{'p95':>10}{'p99':>10}"]
+        for name, p in sorted(self.percentiles().items()):
+            lines.append(f"{name:<28}{p['p50']:>10.3f}{p['p95']:>10.3f}{p['p99']:>10.3f}")
+        return "\n".join(lines)
+
+    def close(self):
+        if self.trace is not None:
+            self.trace.close()
+        if self.frame_no:
+            print(f"profiled {self.frame_no} frames (stages in ms)")
+            print(self.report())
+
+
+class NullProfiler:
+    def stage(self, name):
+        return nullcontext()
+
+    def count(self, name, n=1):
+        pass
+
+    def end_frame(self, totals, levels):
+        pass
+
+    def close(self):
+        pass
+
+
+def make_profiler():
+    if profile_frames.getValue():
+        return FrameProfiler(profile_trace.getValue())
+    return NullProfiler()
+
+
 def make_textbox(text, pos):
     return DirectLabel(
         text=text,
@@ -176,18 +1392,259 @@ class TextBoxScene:
         self.tb.destroy()
 
 
+class DigitGlyphs:
+    """Text geometry for each digit, generated once and copied into numbers.
+
+    Holding the font's glyphs keeps them on its texture page for as long as
+    the copies point into it.
+    """
+    def __init__(self):
+        maker = TextNode("digits")
+        font = maker.getFont()
+        self.glyphs = [font.getGlyph(ord(digit)) for digit in "0123456789"]
+        self.geoms = {}
+        self.advances = {}
+        for digit in "0123456789":
+            maker.setText(digit)
+            self.geoms[digit] = NodePath(maker.generate())
+            self.advances[digit] = maker.calcWidth(digit)
+
+    def number(self, value, parent):
+        """Lays `value` out under `parent` from the cached digits, flattened into one Geom."""
+        number = parent.attachNewNode(str(value))
+        x = 0.0
+        for digit in str(value):
+            place = number.attachNewNode(digit)
+            place.setX(x)
+            self.geoms[digit].instanceTo(place)
+            x += self.advances[digit]
+        number.flattenStrong()
+        return number
+
+
+class Hud:
+    """Score, powerup counts and HP bar, redrawn only when what they show changes.
+
+    Labels are generated once; each number is its own node built from
+    DigitGlyphs, so a change rebuilds just that number and a frame where
+    nothing changed costs four compares.
+    """
+    LINES = (("score", "SCORE: "), ("platforms", "PLATFORMS: "), ("feather_falls", "FEATHER FALLS: "))
+
+    def __init__(self, aspect2d, window=1.0):
+        from direct.gui.DirectWaitBar import DirectWaitBar
+        self.digits = DigitGlyphs()
+        self.root = aspect2d.attachNewNode("hud")
+        panel = self.root.attachNewNode("score")
+        panel.setScale(0.1)
+        panel.setPos(-1.5, 0, 0.75)
+        self.slots = {}
+        for row, (name, text) in enumerate(self.LINES):
+            label = TextNode(f"{name}-label")
+            label.setText(text)
+            line = panel.attachNewNode(name)
+            line.setZ(-row * label.getLineHeight())
+            line.attachNewNode(label.generate())
+            self.slots[name] = line.attachNewNode("value")
+            self.slots[name].setX(label.calcWidth(text))
+        self.numbers = {}
+        self.shown = {}
+
+        self.hp_bar = DirectWaitBar(
+            parent=self.root,
+            text="",  # don’t show numbers, just the bar
+            value=100,
+            range=100,
+            pos=(0, 0, 0.9),    # top-left corner
+            scale=0.4,
+            barColor=(0.1, 0.8, 0.1, 1),       # red bar
+            frameColor=(0, 0, 0, 1),           # black border
+            relief=1,                          # sunken frame
+        )
+        self.rebuilds = 0
+        self.window = window
+        self.recent = deque()
+
+    def update(self, run: Run, now):
+        self.show("score", round(run.score), now)
+        self.show("platforms", run.platform_maker_remaining, now)
+        self.show("feather_falls", run.feather_fall_remaining, now)
+        hp = int(run.hp)
+        if self.shown.get("hp") != hp:
+            self.shown["hp"] = hp
+            self.hp_bar["value"] = hp
+            self.rebuilt(now)
+
+    def show(self, name, value, now):
+        if self.shown.get(name) == value:
+            return
+        self.shown[name] = value
+        old = self.numbers.get(name)
+        if old is not None:
+            old.removeNode()
+        self.numbers[name] = self.digits.number(value, self.slots[name])
+        self.rebuilt(now)
+
+    def rebuilt(self, now):
+        self.rebuilds += 1
+        self.recent.append(now)
+
+    def rebuilds_per_second(self, now):
+        while self.recent and self.recent[0] <= now - self.window:
+            self.recent.popleft()
+        return len(self.recent) / self.window
+
+    def destroy(self):
+        self.hp_bar.destroy()
+        self.root.removeNode()
+
+
+class LiveControls:
+    """Keyboard through inputState and mouse look through the window pointer."""
+    def __init__(self, win):
+        self.win = win
+        self.tokens = [
+            inputState.watchWithModifiers("forward", "w"),
+            inputState.watchWithModifiers("backward", "s"),
+            inputState.watchWithModifiers("left", "a"),
+            inputState.watchWithModifiers("right", "d"),
+            inputState.watchWithModifiers("jump", "space"),
+            inputState.watchWithModifiers("sprint", "shift"),
+        ]
+
+    def release(self):
+        for token in self.tokens:
+            token.release()
+        self.tokens = []
+
+    def is_set(self, name):
+        return inputState.isSet(name)
+
+    def look(self):
+        # an offscreen buffer has no pointer to read
+        if not isinstance(self.win, GraphicsWindow):
+            return 0, 0
+        md = self.win.getPointer(0)
+        x = md.getX()
+        y = md.getY()
+
+        self.win.movePointer(0, self.win.getXSize() // 2, self.win.getYSize() // 2)
+        return x - self.win.getXSize() // 2, y - self.win.getYSize() // 2
+
+
+class IdleControls:
+    """Nothing held and no mouse movement, for scenes nobody plays."""
+    def is_set(self, name):
+        return False
+
+    def look(self):
+        return 0, 0
+
+
+class InputLog:
+    """Everything a run reads from outside GameScene, for bit-identical replays.
+
+    That is the seed `random` was given before the scene was built and, per
+    frame, dt, the held keys as a bitmask, the raw mouse look, and the two
+    things that depend on how fast the machine is: how many queued
+    skyscrapers got built and the quality level. Columns are `array`s
+    written back to back after a fixed header, which also holds the chunked
+    city's seed if there was one, ~28 bytes a frame. The run's
+    outcome (score, survival time, HP and player position) follows them,
+    so a replay can tell when it no longer plays out like the recording.
+    """
+    HEADER = struct.Struct("<4sHQI?Q")
+    OUTCOME = struct.Struct("<6d")
+    MAGIC = b"VRTL"
+    VERSION = 3
+    KEYS = ("forward", "backward", "left", "right", "jump", "sprint")
+
+    def __init__(self, seed, city_seed=None):
+        self.seed = seed
+        self.city_seed = city_seed
+        self.outcome = None
+        self.dt = array("d")
+        self.keys = array("B")
+        self.look = array("d")
+        self.builds = array("H")
+        self.quality = array("B")
+
+    def __len__(self):
+        return len(self.dt)
+
+    def record(self, dt, controls, look, builds, quality):
+        self.dt.append(dt)
+        self.keys.append(sum(1 << bit for bit, name in enumerate(self.KEYS) if controls.is_set(name)))
+        self.look.extend(look)
+        self.builds.append(builds)
+        self.quality.append(quality)
+
+    def finish(self, run: Run, player_pos):
+        self.outcome = (run.score, run.survival_time, run.hp, *player_pos)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.seed, len(self), self.city_seed is not None, self.city_seed or 0))
+            for column in (self.dt, self.keys, self.look, self.builds, self.quality):
+                column.tofile(f)
+            f.write(self.OUTCOME.pack(*self.outcome))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, version, seed, frames, city_chunks, city_seed = cls.HEADER.unpack(f.read(cls.HEADER.size))
+            if magic != cls.MAGIC or version != cls.VERSION:
+                raise ValueError(f"{path} is not a version {cls.VERSION} input log")
+            log = cls(seed, city_seed if city_chunks else None)
+            log.dt.fromfile(f, frames)
+            log.keys.fromfile(f, frames)
+            log.look.fromfile(f, 2 * frames)
+            log.builds.fromfile(f, frames)
+            log.quality.fromfile(f, frames)
+            log.outcome = cls.OUTCOME.unpack(f.read(cls.OUTCOME.size))
+        return log
+
+
+class ReplayControls:
+    """Plays an InputLog back through the same interface LiveControls has."""
+    def __init__(self, log: InputLog):
+        self.log = log
+        self.frame = -1
+
+    def next_frame(self):
+        """Moves on to the next recorded frame and returns its dt, build count and quality level."""
+        self.frame += 1
+        return self.log.dt[self.frame], self.log.builds[self.frame], self.log.quality[self.frame]
+
+    def is_set(self, name):
+        return bool(self.log.keys[self.frame] >> self.log.KEYS.index(name) & 1)
+
+    def look(self):
+        return self.log.look[2 * self.frame], self.log.look[2 * self.frame + 1]
+
+
 class GameScene:
-    def __init__(self, world, render, loader, camera, win, aspect2d, fsm: AppFSM, game_settings: GameSettings, run: Run):
+    def __init__(self, world, render, models: ModelRegistry, camera, win, aspect2d, fsm: AppFSM, game_settings: GameSettings, run: Run, controls=None, profiler=None, recording=None):
         self.render = render
-        self.loader = loader
+        self.models = models
+        self.loader = models.loader
         self.world = world
         self.camera = camera
         self.win = win
         self.aspect2d = aspect2d
+        self.controls = controls if controls is not None else LiveControls(win)
+        # only controls the scene made itself are the scene's to release
+        self.owns_controls = controls is None
+        self.profiler = profiler if profiler is not None else make_profiler()
+        self.recording = recording
+        # set by a replay to rebuild exactly as many skyscrapers per frame as the recorded run did
+        self.spawn_quota = None
+        self.last_look = (0, 0)
         self.fsm = fsm
         self.game_settings = game_settings
         self.run = run
 
+        from panda3d.bullet import BulletDebugNode
         self.world.setGravity(Vec3(0, 0, -self.game_settings.gravity))
         debug_node = BulletDebugNode('Debug')
         debug_node.showWireframe(True)
@@ -197,6 +1654,16 @@ class GameScene:
         debug_np = self.render.attachNewNode(debug_node)
         # debug_np.show()   
         self.world.setDebugNode(debug_np.node())
+        self.pool = BodyPool()
+        if self.game_settings.collision_chunk_size > 0:
+            self.ss_colliders = ChunkedColliders(self.world, self.render, self.game_settings.collision_chunk_size)
+        else:
+            self.ss_colliders = BodyColliders(self.world, self.pool)
+        if self.game_settings.instanced_rendering and InstancedSkyscrapers.supported(self.win):
+            self.ss_renderer = InstancedSkyscrapers(self.models, self.render, self.game_settings)
+        else:
+            self.ss_renderer = NodeSkyscrapers(self.models, self.game_settings)
+        self.setup_collisions()
         self.setup_window()
         self.setup_ui()
         self.setup_light()
@@ -204,36 +1671,52 @@ class GameScene:
         self.setup_player()
         self.setup_controls()
         self.setup_skyscrapers()
-        self.setup_collisions()
 
         self.platforms = []
+        self.spawn_queue = []
+        self.expiry = ExpiryQueue()
+        self.stream_timer = 0.0
+        self.accumulator = 0.0
+        self.player_prev_pos = self.player_pos = self.player_np.getPos()
+        self.view_settings = self.game_settings
+        self.quality_level = 0
+        self.quality = QUALITY_LEVELS[0]
+        self.governor = QualityGovernor(self.game_settings.target_fps) if self.game_settings.target_fps > 0 else None
+        # set by a replay to play back the recorded run's quality levels
+        self.quality_override = None
+        self.city = None
+        # chunk -> ids of its queued and live buildings, for chunks that came back from the generator
+        self.chunk_buildings = {}
+        self.building_chunk = {}
+        if self.game_settings.city_chunks:
+            seed = self.game_settings.city_seed
+            if seed is None:
+                seed = random.getrandbits(32)
+            self.city = CityGenerator(seed, self.game_settings, threaded=self.game_settings.city_thread)
+            self.request_city_chunks()
     
     def setup_ui(self):
-        self.score_node = TextNode("score_node")
-        self.score_node_path = self.aspect2d.attachNewNode(self.score_node)
-        self.score_node_path.set_scale(0.1)
-        self.score_node_path.set_pos((-1.5, 0, 0.75))
-
-        self.hp_bar = DirectWaitBar(
-            text="",  # don’t show numbers, just the bar
-            value=100,
-            range=100,
-            pos=(0, 0, 0.9),    # top-left corner
-            scale=0.4,
-            barColor=(0.1, 0.8, 0.1, 1),       # red bar
-            frameColor=(0, 0, 0, 1),           # black border
-            relief=1,                          # sunken frame
-        )
+        self.hud = Hud(self.aspect2d)
 
     def fetch_model(self):
-        model = self.loader.loadModel(f'assets/building-skyscraper-{random.choice(["a", "b", "c", "d", "e"])}.obj')
-        # model = self.loader.loadModel('OBJ format/building-skyscraper-b.obj')
-        return model
+        return self.models.instance(skyscraper_model_path(random.choice(SKYSCRAPER_VARIANTS)))
 
     def setup_collisions(self):
         self.current_collisions = set()
+        # groups only collide with themselves by default
+        pairs = ({CollisionGroup.PLAYER, CollisionGroup.STATIC}, {CollisionGroup.SENSOR, CollisionGroup.POWERUP})
+        for a, b in itertools.combinations_with_replacement(CollisionGroup, 2):
+            self.world.setGroupCollisionFlag(a, b, {a, b} in pairs)
+        # only recompute the bounds of active objects every step; sleeping
+        # static bodies keep theirs. The player's sensor moves, but ghosts
+        # stay active, and changing a body's shapes (as ChunkedColliders
+        # does) refreshes its bounds, so neither relies on this
+        self.world.setForceUpdateAllAabbs(False)
 
     def setup_window(self):
+        # headless runs have no window and offscreen ones only a buffer
+        if not isinstance(self.win, GraphicsWindow):
+            return
         props = WindowProperties()
         props.setSize(1280, 720)
         # props.setFullscreen(True)
@@ -246,6 +1729,7 @@ class GameScene:
         dlnp = self.render.attachNewNode(dlight)
         dlnp.setHpr(-45, -45, 0)
         self.render.setLight(dlnp)
+        self.dlnp = dlnp
 
         alight = AmbientLight('alight')
         alight.setColor((0.3, 0.3, 0.3, 1))
@@ -259,14 +1743,19 @@ class GameScene:
         self.render.setFog(fog)
 
     def setup_ground(self):
+        from panda3d.bullet import BulletPlaneShape, BulletRigidBodyNode
         self.ground_n = BulletRigidBodyNode('Ground')
+        self.ground_n.setPythonTag("collider", (ColliderKind.GROUND, next(id_counter)))
+        self.ground_n.setIntoCollideMask(CollisionGroup.STATIC.mask)
         self.ground_n.addShape(BulletPlaneShape(Vec3(0, 0, 1), 0))
         self.ground_np = self.render.attachNewNode(self.ground_n)
         self.ground_np.setPos(0, 0, 0)
         fog = Fog("ground-fog")
         fog.setColor(0.5, 0.6, 0.7)   
-        fog.setExpDensity(0.03)     
+        fog.setExpDensity(GROUND_FOG_DENSITY)
         # self.ground_np.attachNewNode(fog)  
+        # this one replaces the distance fog, so it's the one quality scales
+        self.fog = fog
 
         self.render.setFog(fog)
 
@@ -275,14 +1764,23 @@ class GameScene:
         ground_vis = self.ground_np.attachNewNode(ground_cm.generate())
         ground_vis.setHpr(0, -90, 0)   
         ground_vis.setPos(0, 0, 0) 
-        ground_tex = self.loader.loadTexture("assets/Textures/grid.rgb")  
+        ground_tex = self.loader.loadTexture(GROUND_TEXTURE)
         ground_vis.setTexture(ground_tex)
         ground_vis.setTexScale(TextureStage.getDefault(), 50, 50)
         self.world.attachRigidBody(self.ground_n)
     
     def setup_player(self):
+        from panda3d.bullet import BulletCapsuleShape, BulletCharacterControllerNode, BulletGhostNode, ZUp
         self.player_n = BulletCharacterControllerNode(BulletCapsuleShape(1.5, 1.0, ZUp), 1.5, "Player")
+        self.player_n.setIntoCollideMask(CollisionGroup.PLAYER.mask)
         self.player_np = self.render.attachNewNode(self.player_n)
+        # one ghost riding on the player picks up powerups from its overlaps;
+        # a ghost per powerup would be synced and re-tested every step
+        self.sensor_n = BulletGhostNode("PlayerSensor")
+        self.sensor_n.addShape(BulletCapsuleShape(1.5, 1.0, ZUp))
+        self.sensor_n.setIntoCollideMask(CollisionGroup.SENSOR.mask)
+        self.player_np.attachNewNode(self.sensor_n)
+        self.world.attachGhost(self.sensor_n)
         self.player_np.setPos(0, 0, 33)
         self.player_n.setGravity(self.game_settings.gravity)
         self.player_n.setMaxJumpHeight(self.game_settings.jump_height)
@@ -295,79 +1793,61 @@ class GameScene:
         self.pitch = 0  
     
     def setup_controls(self):
-        inputState.watchWithModifiers("forward", "w")
-        inputState.watchWithModifiers("backward", "s")
-        inputState.watchWithModifiers("left", "a")
-        inputState.watchWithModifiers("right", "d")
-        inputState.watchWithModifiers("jump", "space")
-        inputState.watchWithModifiers("sprint", "shift")
-
         self.was_jump_down = False
 
     def setup_skyscrapers(self):
         home_ss_id = next(id_counter)
-        home_ss = Skyscraper(
+        self.skyscrapers = SkyscraperStore()
+        home_ss = self.skyscrapers.add(
             id=home_ss_id,
-            node_path=self.render.attachNewNode(BulletRigidBodyNode(f'Skyscraper#{home_ss_id}')),
+            node_path=self.render.attachNewNode(f'Skyscraper#{home_ss_id}'),
             pos=Vec3(0, 0, 0),
             scale=Vec3(20, 30, 30),
-            ttl=5,
             model=self.fetch_model(),
             powerup=None
         )
-        home_ss.model.setHpr(0, 90, 0)
-        self.skyscrapers = {home_ss_id: home_ss}
+        home_ss.model.setHpr(*SKYSCRAPER_HPR)
+        self.ss_index = SpatialHash()
         for ss in self.skyscrapers.values():
             self.setup_skyscraper(ss)
     
     def setup_skyscraper(self, ss: Skyscraper):
-        ss_shape = BulletBoxShape(ss.scale*0.5)
-        ss_node = ss.node_path.node()
-        ss_node.setMass(0)  
-        ss_node.addShape(ss_shape)
         ss.node_path.setPos(ss.pos.x, ss.pos.y, ss.scale.z/2)
-        self.world.attachRigidBody(ss_node)
-        bounds = ss.model.getTightBounds()
-        bx = abs(bounds[1].x - bounds[0].x)
-        by = abs(bounds[1].y - bounds[0].y)
-        bz = abs(bounds[1].z - bounds[0].z)
-        ss.model.setScale(ss.scale.x/bx, ss.scale.z/bz, ss.scale.y/by)
-        ss.model.reparentTo(ss.node_path)
-        ss.model.setPos(0, 0, -ss.scale.z/2)
+        self.ss_colliders.add(ss)
+        self.ss_index.insert(ss.id, ss.pos, ss.scale)
+        self.ss_renderer.add(ss)
 
         if ss.powerup is None:
             return
         
         pu_scale = Vec3(1, 1, 1)
-        pu_shape = BulletBoxShape(pu_scale * 0.5)
-        pu_node = BulletRigidBodyNode(f'Powerup')
+        pu_np = self.pool.acquire("powerup", 'Powerup', ss.node_path)
+        pu_node = pu_np.node()
         pu_node.setTag("powerup", ss.powerup.value)
-        pu_node.setMass(0)  
-        pu_node.addShape(pu_shape)
-        pu_np = ss.node_path.attachNewNode(pu_node)
+        pu_node.setPythonTag("collider", (ColliderKind.POWERUP, next(id_counter)))
+        pu_node.setIntoCollideMask(CollisionGroup.POWERUP.mask)
+        self.pool.set_box(pu_np, pu_scale * 0.5)
         pu_np.setPos(Vec3(0, 0, ss.scale.z/2 + 1))
 
         self.world.attachRigidBody(pu_node)
-        model = self.loader.loadModel('models/box.egg')
+        model = pu_np.find("model")
+        if model.isEmpty():
+            model = self.models.instance(BOX_MODEL)
+            model.setScale(pu_scale)
+            model.reparentTo(pu_np)
+            model.setPos(-pu_scale*0.5)
         pu_colors = {
             PowerupTypes.FEATHER_FALL: (0, 0, 1, 1),
             PowerupTypes.PLAT_MAKE: (0, 1, 0, 1),
             PowerupTypes.HEAL: (1, 0, 0, 1)
         }
         model.setColor(*pu_colors[ss.powerup])
-        model.setScale(pu_scale)
-        model.reparentTo(pu_np)
-        model.setPos(-pu_scale*0.5)
 
 
     def process_mouse(self):
-        md = self.win.getPointer(0)
-        x = md.getX()
-        y = md.getY()
-
-        self.win.movePointer(0, self.win.getXSize() // 2, self.win.getYSize() // 2)
-        dx = (x - self.win.getXSize() // 2) * self.game_settings.mouse_sensitivity
-        dy = (y - self.win.getYSize() // 2) * self.game_settings.mouse_sensitivity
+        dx, dy = self.last_look = self.controls.look()
+        dx *= self.game_settings.mouse_sensitivity
+        dy *= self.game_settings.mouse_sensitivity
 
         self.player_np.setH(self.player_np.getH() - dx)
 
@@ -376,13 +1856,13 @@ class GameScene:
 
     def process_movement(self, dt):
         direction = Vec3(0, 0, 0)
-        if inputState.isSet("forward"):
+        if self.controls.is_set("forward"):
             direction.y += 1
-        if inputState.isSet("backward"):
+        if self.controls.is_set("backward"):
             direction.y -= 1
-        if inputState.isSet("left"):
+        if self.controls.is_set("left"):
             direction.x -= 1
-        if inputState.isSet("right"):
+        if self.controls.is_set("right"):
             direction.x += 1
 
         direction.y += self.run.forward_force
@@ -393,13 +1873,13 @@ class GameScene:
         dir_world = quat.xform(direction)
         dir_world.setZ(0)
         dir_world.normalize()
-        if inputState.isSet("sprint"):
+        if self.controls.is_set("sprint"):
             vel = dir_world * self.game_settings.sprint_speed
         else:
             vel = dir_world * self.game_settings.speed
         self.player_n.setLinearMovement(vel, False)
 
-        jump_down = inputState.isSet("jump")
+        jump_down = self.controls.is_set("jump")
 
         if jump_down and not self.was_jump_down:
             if self.player_n.isOnGround():
@@ -407,48 +1887,67 @@ class GameScene:
             elif self.run.platform_maker_remaining > 0:
                 self.run.platform_maker_remaining -= 1
                 djp_scale = Vec3(10, 10, 0.5)
-                djp_shape = BulletBoxShape(djp_scale * 0.5)
-                djp_node = BulletRigidBodyNode(f'DJPlat')
-                djp_node.setMass(0)  
-                djp_node.addShape(djp_shape)
-                djp_np = self.render.attachNewNode(djp_node)
+                djp_np = self.pool.acquire("platform", 'DJPlat', self.render)
+                djp_node = djp_np.node()
+                djp_node.setPythonTag("collider", (ColliderKind.PLATFORM, next(id_counter)))
+                djp_node.setIntoCollideMask(CollisionGroup.STATIC.mask)
+                self.pool.set_box(djp_np, djp_scale * 0.5)
                 djp_np.setPos(self.player_np.getPos() + Vec3(0, 0, -1))
                 self.world.attachRigidBody(djp_node)
-                model = self.loader.loadModel('models/box.egg')
-                model.setColor(1, 0, 1, 1)
-                model.setScale(djp_scale)
-                model.reparentTo(djp_np)
-                model.setPos(-djp_scale*0.5)
-                self.platforms.append(
-                    Platform(
-                        node_path=djp_np, 
-                        pos=djp_np.getPos(), 
-                        scale=djp_scale, 
-                        ttl=3,
-                        model=model
-                    )
+                model = djp_np.find("model")
+                if model.isEmpty():
+                    model = self.models.instance(BOX_MODEL)
+                    model.setColor(1, 0, 1, 1)
+                    model.setScale(djp_scale)
+                    model.reparentTo(djp_np)
+                    model.setPos(-djp_scale*0.5)
+                plat = Platform(
+                    node_path=djp_np, 
+                    pos=djp_np.getPos(), 
+                    scale=djp_scale, 
+                    ttl=3,
+                    model=model
                 )
+                self.platforms.append(plat)
+                self.expiry.schedule(plat.ttl, plat)
 
         self.was_jump_down = jump_down
 
     def process_collisions(self):
-        new_collisions = set()
-        result = self.world.contactTest(self.player_n)
+        touching = {}
+        # filtered, so this only tests the static bodies the player stands on
+        result = self.world.contactTest(self.player_n, True)
         for contact in result.getContacts():
             n0, n1 = contact.getNode0(), contact.getNode1()
-            other = n1 if n0.getName() == "Player" else n0
-            new_collisions.add(other.getName())
-            if other.getName() not in self.current_collisions:
-                if other.getName().startswith("Skyscraper"):
-                    self.on_player_hit_skyscraper(other)
-                elif other.getName() == "Ground":
-                    self.on_player_hit_ground(other)
-                elif other.getName() == "Powerup":
-                    self.on_player_hit_powerup(other)
-        self.current_collisions = new_collisions
+            if n0 == self.player_n:
+                other, index = n1, contact.getIdx1()
+            else:
+                other, index = n0, contact.getIdx0()
+            kind, id = other.getPythonTag("collider")
+            if kind == ColliderKind.CHUNK:
+                kind, id = ColliderKind.SKYSCRAPER, self.ss_colliders.skyscraper_at(id, index)
+            touching[id] = (kind, other)
+        # the sensor only pairs with powerups, but its overlaps are just
+        # bounding boxes; a contact test confirms which it really touches
+        if self.sensor_n.getNumOverlappingNodes():
+            for contact in self.world.contactTest(self.sensor_n, True).getContacts():
+                n0, n1 = contact.getNode0(), contact.getNode1()
+                other = n1 if n0 == self.sensor_n else n0
+                kind, id = other.getPythonTag("collider")
+                touching[id] = (kind, other)
+        for id in touching.keys() - self.current_collisions:
+            kind, other = touching[id]
+            if kind == ColliderKind.SKYSCRAPER:
+                self.on_player_hit_skyscraper(id)
+            elif kind == ColliderKind.GROUND:
+                self.on_player_hit_ground(other)
+            elif kind == ColliderKind.POWERUP:
+                self.on_player_hit_powerup(other)
+        self.current_collisions = touching.keys()
     
     def spawn_neighbours(self, ss: Skyscraper):
-        n_attempts = 7
+        n_attempts = self.quality.spawn_attempts
+        player = self.player_np.getPos()
         for _ in range(n_attempts):
             dx = random.randint(5, 10) 
             dy = random.randint(5, 10)
@@ -465,32 +1964,96 @@ class GameScene:
                 py = ss.pos.y - ss.scale.y/2 - sy/2 - dy
 
             if not self.intersects_ss(Vec2(px, py), Vec2(sx, sy)):
-                ss_id = next(id_counter)
-                ss = Skyscraper(
-                    id=ss_id,
-                    node_path=self.render.attachNewNode(BulletRigidBodyNode(f'Skyscraper#{ss_id}')),
+                ss = SpawnJob(
+                    id=next(id_counter),
                     pos=Vec3(px, py, 0),
                     scale=Vec3(sx, sy, sz),
-                    ttl=5,
-                    model=self.fetch_model(),
+                    model_path=skyscraper_model_path(random.choice(SKYSCRAPER_VARIANTS)),
                     powerup=random.choice([None, *PowerupTypes])
                 )
-                ss.model.setHpr(0, 90, 0)
-                self.skyscrapers[ss_id] = ss
-                self.setup_skyscraper(ss)
+                self.queue_spawn(ss, player)
+
+    def queue_spawn(self, job: SpawnJob, player: Vec3):
+        # reserve the footprint now so later layouts can't overlap it
+        self.ss_index.insert(job.id, job.pos, job.scale)
+        distance = (job.pos.xy - player.xy).length()
+        heapq.heappush(self.spawn_queue, (distance, job.id, job))
+
+    def request_city_chunks(self):
+        for chunk in self.city.chunks_within(self.player_np.getPos(), self.view_settings.stream_radius):
+            self.city.request(chunk)
+
+    def release_city_chunks(self):
+        """Lets chunks outside the stream radius that have nothing left in
+        them be requested again; ones still in flight or with buildings are kept."""
+        keep = set(self.city.chunks_within(self.player_np.getPos(), self.view_settings.stream_radius))
+        for chunk in self.city.requested - keep:
+            if chunk in self.chunk_buildings and not self.chunk_buildings[chunk]:
+                del self.chunk_buildings[chunk]
+                self.city.release(chunk)
+
+    def queue_city_chunks(self):
+        player = self.player_np.getPos()
+        for chunk, layout in self.city.poll():
+            ids = self.chunk_buildings[chunk] = set()
+            for x, y, sx, sy, sz, variant, powerup in layout:
+                pos, scale = Vec3(x, y, 0), Vec3(sx, sy, sz)
+                # chunks keep clear of each other, but not of the home building
+                if self.intersects_ss(pos.xy, scale.xy):
+                    continue
+                job = SpawnJob(
+                    id=next(id_counter),
+                    pos=pos,
+                    scale=scale,
+                    model_path=skyscraper_model_path(variant),
+                    powerup=powerup
+                )
+                self.queue_spawn(job, player)
+                ids.add(job.id)
+                self.building_chunk[job.id] = chunk
+
+    def process_spawn_queue(self, quota=None):
+        """Builds queued skyscrapers until the frame's time budget runs out,
+        or exactly `quota` of them when replaying. Returns how many were built."""
+        deadline = time.perf_counter() + self.game_settings.spawn_budget_ms / 1000
+        built = 0
+        while self.spawn_queue and (quota is None or built < quota):
+            entry = heapq.heappop(self.spawn_queue)
+            job = entry[2]
+            if not self.models.is_loaded(job.model_path):
+                self.models.load_async(job.model_path, lambda entry=entry: heapq.heappush(self.spawn_queue, entry))
+                continue
+            self.build_skyscraper(job)
+            built += 1
+            if quota is None and time.perf_counter() >= deadline:
+                break
+        return built
+
+    def build_skyscraper(self, job: SpawnJob):
+        model = self.models.instance(job.model_path)
+        model.setHpr(*SKYSCRAPER_HPR)
+        ss = self.skyscrapers.add(
+            id=job.id,
+            node_path=self.render.attachNewNode(f'Skyscraper#{job.id}'),
+            pos=job.pos,
+            scale=job.scale,
+            model=model,
+            powerup=job.powerup
+        )
+        self.setup_skyscraper(ss)
+        self.profiler.count("spawns")
 
     def intersects_ss(self, pos: Vec2, scale: Vec2):
-        for other in self.skyscrapers.values():
-            if (abs(pos.x - other.pos.x) * 2 < (scale.x + other.scale.x) and
-                abs(pos.y - other.pos.y) * 2 < (scale.y + other.scale.y)):
-                return True
-        return False
+        return self.ss_index.intersects(pos, scale)
 
-    def on_player_hit_skyscraper(self, node):
-        ss = self.skyscrapers[int(node.getName().split("#")[1])]
+    def on_player_hit_skyscraper(self, ss_id):
+        ss = self.skyscrapers[ss_id]
         if not ss.timer_triggered:
             ss.timer_triggered = True
-            self.spawn_neighbours(ss)
+            # by id: the view's slot is reused once the building is gone
+            self.expiry.schedule(SKYSCRAPER_TTL, ss.id)
+            if self.city is None:
+                self.spawn_neighbours(ss)
         self.run.score += 10      
         fall = self.run.last_ground_height - ss.scale.z
         fall_damage = max(0, fall//10) * 20
@@ -512,69 +2075,285 @@ class GameScene:
             case PowerupTypes.HEAL:
                 self.run.hp = min(100, self.run.hp+20)
         self.world.remove(node)
-        pu_np.removeNode()
+        self.pool.release("powerup", pu_np)
 
     def on_player_hit_ground(self, node):
         self.run.hp = 0
 
     def update_ttl(self, dt):
-        decay =  self.game_settings.ttl_decay_rate * dt
-        new_ss = {}
-        for id, ss in self.skyscrapers.items():
-            if ss.timer_triggered:
-                ss.ttl -= decay
-            if ss.ttl > 0:
-                new_ss[id] = ss
-            else:
-                self.world.remove(ss.node_path.node())
-                ss.node_path.removeNode()
-        self.skyscrapers = new_ss
-
-        new_plats = []
-        for plat in self.platforms:
-            plat.ttl -= decay
-            if plat.ttl > 0:
-                new_plats.append(plat)
+        decay = self.game_settings.ttl_decay_rate * dt
+        for item in self.expiry.advance(decay):
+            if isinstance(item, int):
+                ss = self.skyscrapers.get(item)
+                if ss is not None:
+                    self.remove_skyscraper(ss)
             else:
-                self.world.remove(plat.node_path.node())
-                plat.node_path.removeNode()
-        self.platforms = new_plats
+                self.remove_platform(item)
+
+    def remove_skyscraper(self, ss: Skyscraper):
+        id, node_path = ss.id, ss.node_path
+        for pu_np in node_path.findAllMatches("Powerup"):
+            self.world.remove(pu_np.node())
+            self.pool.release("powerup", pu_np)
+        self.ss_colliders.remove(ss)
+        self.ss_renderer.remove(ss)
+        node_path.removeNode()
+        self.ss_index.remove(id)
+        self.skyscrapers.remove(id)
+        chunk = self.building_chunk.pop(id, None)
+        if chunk is not None:
+            self.chunk_buildings[chunk].discard(id)
+
+    def remove_platform(self, plat: Platform):
+        self.platforms.remove(plat)
+        self.world.remove(plat.node_path.node())
+        self.pool.release("platform", plat.node_path)
+
+    def update_streaming(self, dt):
+        self.stream_timer += dt
+        if self.stream_timer < self.game_settings.stream_interval:
+            return
+        self.stream_timer = 0.0
+        pos = self.player_np.getPos()
+        for id in self.skyscrapers.outside(pos, self.view_settings.stream_radius):
+            self.remove_skyscraper(self.skyscrapers[id])
+        if self.city is not None:
+            self.release_city_chunks()
+            self.request_city_chunks()
+        self.ss_renderer.update_lod(pos, self.skyscrapers)
+
+    def live_counts(self):
+        """What streaming keeps bounded; reported to the profiler every frame."""
+        return {
+            "live_bodies": self.world.getNumRigidBodies(),
+            "skyscrapers": len(self.skyscrapers),
+            "platforms": len(self.platforms),
+        }
+
+    def set_quality(self, level):
+        self.quality_level = level
+        self.quality = QUALITY_LEVELS[level]
+        scale = self.quality.view_scale
+        base = self.game_settings
+        self.view_settings = replace(
+            base,
+            stream_radius=base.stream_radius * scale,
+            lod_distances=tuple(d * scale for d in base.lod_distances),
+            cull_distance=base.cull_distance * scale,
+        )
+        self.ss_renderer.set_settings(self.view_settings)
+        self.fog.setExpDensity(GROUND_FOG_DENSITY / scale)
+        if self.quality.directional_light:
+            self.render.setLight(self.dlnp)
+        else:
+            self.render.clearLight(self.dlnp)
 
     def update_forward_force(self):
         self.run.forward_force += self.game_settings.forward_force_rate
     
-    def update_score(self):  
-        self.score_node.set_text(f"SCORE: {round(self.run.score)}\nPLATFORMS: {self.run.platform_maker_remaining}\nFEATHER FALLS: {self.run.feather_fall_remaining}")
-
     def update_last_ground_height(self):
         if self.player_n.isOnGround():
             self.run.last_ground_height = self.player_np.getPos().z
 
-    def update(self, task):
-        dt = globalClock.getDt()
-        self.process_mouse()
-        self.process_movement(dt)
-        self.update_ttl(dt)
+    def step(self, dt):
+        prof = self.profiler
+        self.run.survival_time += dt
+        with prof.stage("process_movement"):
+            self.process_movement(dt)
+        with prof.stage("update_ttl"):
+            self.update_ttl(dt)
+        with prof.stage("update_streaming"):
+            self.update_streaming(dt)
         # self.update_skyscrapers()
-        self.update_forward_force()
-        self.update_score()
-        self.world.doPhysics(dt)
-        self.process_collisions()
-        self.update_last_ground_height()
-        self.hp_bar["value"] = int(self.run.hp)
+        with prof.stage("update_forward_force"):
+            self.update_forward_force()
+        with prof.stage("doPhysics"):
+            self.world.doPhysics(dt, 1, dt)
+        with prof.stage("process_collisions"):
+            self.process_collisions()
+        with prof.stage("update_last_ground_height"):
+            self.update_last_ground_height()
+
+    def update(self, task):
+        self.advance(globalClock.getDt())
+        return task.cont
+
+    def advance(self, frame_dt):
+        prof = self.profiler
+        step = self.game_settings.physics_step
+        # drop whatever doesn't fit in max_substeps instead of spiralling after a hitch
+        self.accumulator = min(self.accumulator + frame_dt, step * self.game_settings.max_substeps)
+        if self.quality_override is not None:
+            level = self.quality_override
+        elif self.governor is not None:
+            level = self.governor.update(frame_dt, self.run.survival_time)
+        else:
+            level = self.quality_level
+        if level != self.quality_level:
+            self.set_quality(level)
+        # undo last frame's interpolation so bullet steps from the real position
+        self.player_np.setPos(self.player_pos)
+        with prof.stage("process_mouse"):
+            self.process_mouse()
+        while self.accumulator >= step:
+            self.player_prev_pos = self.player_pos
+            self.step(step)
+            self.player_pos = self.player_np.getPos()
+            self.accumulator -= step
+            prof.count("substeps")
+        alpha = self.accumulator / step
+        self.player_np.setPos(self.player_prev_pos + (self.player_pos - self.player_prev_pos) * alpha)
+        if self.city is not None:
+            with prof.stage("city_chunks"):
+                self.queue_city_chunks()
+        with prof.stage("process_spawn_queue"):
+            built = self.process_spawn_queue(self.spawn_quota)
+        with prof.stage("ss_renderer"):
+            self.ss_renderer.flush()
+        with prof.stage("hud"):
+            self.hud.update(self.run, self.run.survival_time)
+        pool = self.pool.stats()
+        prof.end_frame(
+            totals={
+                "model_loads": self.models.load_misses,
+                "model_instances": self.models.load_hits + self.models.load_misses,
+                # should stay at zero once every variant has been measured
+                "bounds_misses": self.models.bounds_misses,
+                "hud_rebuilds": self.hud.rebuilds,
+            },
+            levels={
+                **self.live_counts(),
+                "skyscraper_proxies": self.ss_colliders.proxies,
+                **{f"pool_live_{kind}": n for kind, n in pool["live"].items()},
+                **{f"pool_free_{kind}": n for kind, n in pool["free"].items()},
+                "pool_reuse_rate": pool["reuse_rate"],
+                "triangles": self.ss_renderer.triangles,
+                "spawn_queue": len(self.spawn_queue),
+                "quality": self.quality_level,
+                "hud_rebuilds_per_s": self.hud.rebuilds_per_second(self.run.survival_time),
+            },
+        )
+        if self.recording is not None:
+            self.recording.record(frame_dt, self.controls, self.last_look, built, self.quality_level)
         if self.run.hp <= 0:
             self.fsm.request("MainMenu", int(self.run.score))
-        return task.cont
+
+    def destroy(self):
+        """Releases what the scene registered outside its render root: input
+        watchers, bodies in the world, the camera, the HUD and worker threads.
+        The caller still removes the render root itself."""
+        if self.city is not None:
+            self.city.stop()
+        if self.owns_controls:
+            self.controls.release()
+        self.profiler.close()
+        # the camera rides on the player; don't let it keep the old scene graph alive
+        self.camera.detachNode()
+        for body in [*self.world.getRigidBodies(), *self.world.getGhosts()]:
+            self.world.remove(body)
+        self.world.remove(self.player_n)
+        self.world.clearDebugNode()
+        # the light and fog attribs point back into the scene graph they're set on
+        self.render.clearLight()
+        self.render.clearFog()
+        self.spawn_queue.clear()
+        self.ss_renderer.destroy()
+        self.hud.destroy()
 
 
 class App(ShowBase):
+    # igLoop, which draws the frame, runs at sort 50
+    AFTER_DRAW_SORT = 60
+
     def __init__(self):
         super().__init__()
-        fsm = AppFSM(self)
+        fsm = self.fsm = AppFSM(self)
         self.setBackgroundColor(0.5, 0.6, 0.7)
         self.disableMouse()
+        self.models = ModelRegistry(self.loader)
+        self.latencies = defaultdict(list)
         self.accept("escape", lambda: fsm.request("MainMenu") if fsm.state != "MainMenu" else sys.exit(0))
         fsm.request("MainMenu")
+        self.time_to_frame("menu", LAUNCHED, then=self.prewarm)
+
+    def time_to_frame(self, name, since, then=None):
+        """Records in `latencies[name]` how long from `since` until the frame
+        being built now has been drawn."""
+        def drawn(task):
+            latency = time.perf_counter() - since
+            self.latencies[name].append(latency)
+            if startup_timing.getValue():
+                print(f"time to {name}: {latency * 1e3:.1f} ms")
+            if then is not None:
+                then()
+            return task.done
+        self.taskMgr.add(drawn, f"time-to-{name}", sort=self.AFTER_DRAW_SORT)
+
+    def prewarm(self):
+        """Gets a game's assets ready while the menu sits idle.
+
+        The models stream in on Panda's loader thread; a plain thread imports
+        the game-only modules and loads the ground texture into the
+        TexturePool. Once both are in, warm_up draws a throwaway game.
+        """
+        paths = [*map(skyscraper_model_path, SKYSCRAPER_VARIANTS), BOX_MODEL]
+        for path in paths:
+            self.models.load_async(path, lambda: None)
+        loading = threading.Thread(target=self.load_in_background, name="prewarm", daemon=True)
+        loading.start()
+
+        def wait(task):
+            if loading.is_alive() or not all(map(self.models.is_loaded, paths)):
+                return task.cont
+            # a game started before this got here warms up on its own
+            if self.fsm.state != "Game":
+                self.warm_up()
+            return task.done
+        self.taskMgr.add(wait, "prewarm")
+
+    @staticmethod
+    def load_in_background():
+        import panda3d.bullet
+        # any attribute runs numpy's deferred import
+        np.ndarray
+        TexturePool.loadTexture(GROUND_TEXTURE)
+
+    def warm_up(self):
+        """Builds a game into a tiny buffer on the window's GSG and draws it
+        once, so the first real game frame doesn't wait on the driver to
+        compile shaders and states and upload textures."""
+        from panda3d.bullet import BulletWorld
+        buffer = self.win.makeTextureBuffer("prewarm", 64, 64) if self.win is not None else None
+        if buffer is None:
+            return
+        state = random.getstate()
+        root = NodePath("prewarm")
+        camera = NodePath(Camera("prewarm", PerspectiveLens()))
+        buffer.makeDisplayRegion().setCamera(camera)
+        # the HUD is drawn over it the way render2d is; its text is most of the work
+        hud = NodePath("prewarm-hud")
+        hud.setDepthTest(False)
+        hud.setDepthWrite(False)
+        lens = OrthographicLens()
+        lens.setFilmSize(2, 2)
+        lens.setNearFar(-1000, 1000)
+        hud_region = buffer.makeDisplayRegion()
+        hud_region.setSort(10)
+        hud_region.setCamera(hud.attachNewNode(Camera("prewarm-hud", lens)))
+        scene = GameScene(
+            BulletWorld(), root, self.models, camera, buffer, hud, self.fsm,
+            GameSettings(), Run(), controls=IdleControls(), profiler=NullProfiler(),
+        )
+        scene.advance(0)
+        # the first frame only opens the buffer
+        self.graphicsEngine.renderFrame()
+        self.graphicsEngine.renderFrame()
+        scene.destroy()
+        camera.removeNode()
+        root.removeNode()
+        hud.removeNode()
+        self.graphicsEngine.removeWindow(buffer)
+        random.setstate(state)
     
     def exit_app(self):
         sys.exit(0)
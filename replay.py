@@ -0,0 +1,72 @@
+"""Replays an input log headlessly through the normal GameScene update path.
+
+Record a game by setting the `vertigo-record` config variable, e.g. with a
+line `vertigo-record run.vrtl` in a .prc file on the PRC path; each game
+overwrites the log when it ends. A replay reseeds `random`, feeds back the
+recorded dt, keys and mouse look frame by frame, and builds as many queued
+skyscrapers and runs at the same quality level each frame as the recorded
+run did, so it plays out identically on any machine. The log also holds
+how the recorded run ended, and a replay that ends any differently fails.
+The profiler report makes it a regression benchmark:
+
+    uv run python replay.py run.vrtl
+    uv run python replay.py run.vrtl --repeat 3 --trace frames.jsonl
+"""
+import argparse
+import random
+
+from panda3d.core import NodePath
+
+from main import FrameProfiler, GameScene, GameSettings, InputLog, ReplayControls, Run
+import sim
+
+
+def replay(log: InputLog, profiler):
+    from panda3d.bullet import BulletWorld
+    random.seed(log.seed)
+    fsm = sim.HeadlessFSM()
+    controls = ReplayControls(log)
+    game_np = sim.base.render.attachNewNode(NodePath("game").node())
+    scene = GameScene(
+        BulletWorld(), game_np, sim.models, NodePath("camera"), None, sim.base.aspect2d, fsm,
+        GameSettings(city_chunks=log.city_seed is not None, city_seed=log.city_seed, city_thread=False),
+        Run(), controls=controls, profiler=profiler,
+    )
+    for _ in range(len(log)):
+        dt, scene.spawn_quota, scene.quality_override = controls.next_frame()
+        scene.advance(dt)
+        if fsm.finished:
+            break
+    outcome = (scene.run.score, scene.run.survival_time, scene.run.hp, *scene.player_np.getPos(), controls.frame + 1)
+    scene.destroy()
+    game_np.removeNode()
+    return outcome
+
+
+def describe(ending):
+    score, survival_time, hp, x, y, z = ending
+    return f"score {round(score)}, survived {survival_time:.3f}s, hp {hp}, player at ({x:.3f}, {y:.3f}, {z:.3f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log")
+    parser.add_argument("--repeat", type=int, default=1, help="replay this many times and check every run ends the same")
+    parser.add_argument("--trace", default="", help="JSON-lines file to write one record per replayed frame to")
+    args = parser.parse_args()
+
+    log = InputLog.load(args.log)
+    sim.init_worker()
+    outcomes = set()
+    for _ in range(args.repeat):
+        *ending, frames = outcome = replay(log, FrameProfiler(args.trace))
+        outcomes.add(outcome)
+        print(f"{frames}/{len(log)} frames: " + describe(ending))
+    if len(outcomes) > 1:
+        raise SystemExit("replays diverged")
+    if frames != len(log) or tuple(ending) != log.outcome:
+        raise SystemExit("replay drifted from the recorded run, which ended with " + describe(log.outcome))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Headless batch simulation of VERTIGO runs.
+
+Runs GameScene without a window, driven by a scripted bot instead of the
+keyboard and mouse, and sweeps GameSettings over a multiprocessing pool:
+
+    uv run python sim.py --runs 1000 --speed 20 30 --gravity 9.81 19.62 --out sweep.csv
+
+With --city-chunks the bot runs through the pre-generated chunked city
+instead, laid out from each run's seed.
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import random
+import time
+
+from panda3d.core import NodePath, loadPrcFileData
+
+from main import GameScene, GameSettings, ModelRegistry, Run, SKYSCRAPER_VARIANTS, BOX_MODEL, skyscraper_model_path
+
+SWEEP_PARAMS = ("speed", "gravity", "jump_speed", "ttl_decay_rate", "forward_force_rate")
+
+base = None
+models = None
+
+
+class BotControls:
+    """Scripted stand-in for the keyboard and mouse: runs forward, hops and wanders."""
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.held = set()
+
+    def is_set(self, name):
+        return name in self.held
+
+    def look(self):
+        # look() is polled once per frame, so the bot decides its keys here too
+        self.held = {"forward"}
+        if self.rng.random() < 0.5:
+            self.held.add("sprint")
+        if self.rng.random() < 0.02:
+            self.held.add("jump")
+        return self.rng.gauss(0, 15), 0
+
+
+class HeadlessFSM:
+    def __init__(self):
+        self.finished = False
+
+    def request(self, state, *args):
+        self.finished = True
+
+
+def init_worker():
+    global base, models
+    from direct.showbase.ShowBase import ShowBase
+    loadPrcFileData("", "window-type none")
+    loadPrcFileData("", "audio-library-name null")
+    loadPrcFileData("", "notify-level-device fatal")
+    base = ShowBase()
+    models = ModelRegistry(base.loader)
+    models.preload([*map(skyscraper_model_path, SKYSCRAPER_VARIANTS), BOX_MODEL])
+
+
+def simulate(seed, settings: GameSettings, max_time):
+    from panda3d.bullet import BulletWorld
+    random.seed(seed)
+    fsm = HeadlessFSM()
+    game_np = base.render.attachNewNode(NodePath("game").node())
+    scene = GameScene(
+        BulletWorld(), game_np, models, NodePath("camera"), None, base.aspect2d, fsm,
+        settings, Run(), controls=BotControls(random.Random(seed)),
+    )
+    steps = 0
+    while not fsm.finished and scene.run.survival_time < max_time:
+        scene.advance(settings.physics_step)
+        steps += 1
+    scene.destroy()
+    game_np.removeNode()
+    return scene.run, steps
+
+
+def run_one(job):
+    seed, overrides, max_time, city_chunks = job
+    # chunks are laid out on the frame they are asked for, so a seed always plays out the same
+    settings = GameSettings(**overrides, city_chunks=city_chunks, city_thread=False)
+    run, steps = simulate(seed, settings, max_time)
+    return {
+        "seed": seed,
+        **overrides,
+        "score": round(run.score),
+        "survival_time": round(run.survival_time, 4),
+        "hp": run.hp,
+        "steps": steps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=100, help="seeded runs per parameter combination")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--max-time", type=float, default=120.0, help="simulated seconds before a run is cut off")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default="sweep.csv")
+    parser.add_argument("--city-chunks", action="store_true", help="run through the pre-generated chunked city")
+    for name in SWEEP_PARAMS:
+        default = getattr(GameSettings, name)
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, nargs="+", default=[default])
+    args = parser.parse_args()
+
+    grid = [dict(zip(SWEEP_PARAMS, values)) for values in itertools.product(*(getattr(args, name) for name in SWEEP_PARAMS))]
+    jobs = [(seed, overrides, args.max_time, args.city_chunks) for overrides in grid for seed in range(args.seed, args.seed + args.runs)]
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.processes, initializer=init_worker) as pool, open(args.out, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["seed", *SWEEP_PARAMS, "score", "survival_time", "hp", "steps"])
+        writer.writeheader()
+        for row in pool.imap_unordered(run_one, jobs, chunksize=max(1, len(jobs) // (args.processes * 8))):
+            writer.writerow(row)
+    elapsed = time.perf_counter() - start
+
+    rate = len(jobs) / elapsed
+    print(f"{len(jobs)} runs in {elapsed:.1f}s on {args.processes} processes")
+    print(f"{rate:.2f} runs/s, {rate / args.processes:.2f} runs/s/core -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Leak check: cycles the app Menu -> Game -> Menu headlessly and fails if
+anything a game leaves behind keeps growing.
+
+Each cycle starts a game from the menu the way NEW GAME does, runs it for a
+few frames through the task manager, rendering to an offscreen buffer,
+and returns to the menu. After a
+warm-up, process RSS, the scene graph node count, messenger hooks and Python
+objects must stay flat, and every game's BulletWorld must be left without
+bodies, ghosts or characters once the game has exited:
+
+    uv run python soak.py --cycles 300
+
+On a machine without a display, pass e.g. `--display p3headlessgl`.
+"""
+import argparse
+import gc
+import os
+import random
+import resource
+
+from panda3d.core import ClockObject, loadPrcFileData
+
+import main as game
+
+
+def rss_bytes():
+    # current RSS where /proc has it; peak RSS is still flat if nothing leaks
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def sample(app, bodies):
+    gc.collect()
+    return {
+        "rss_mb": rss_bytes() / 2**20,
+        "nodes": app.render.countNumDescendants() + app.aspect2d.countNumDescendants(),
+        "hooks": sum(len(app.messenger.whoAccepts(event) or ()) for event in app.messenger.getEvents()),
+        "objects": len(gc.get_objects()),
+        "bodies": bodies,
+    }
+
+
+def cycle(app, fsm, frames):
+    """Plays one game and returns how many Bullet objects its world still
+    holds after the game has exited."""
+    # the same seed every cycle, so every game builds the same city
+    random.seed(0)
+    fsm.request("Game")
+    for _ in range(frames):
+        app.taskMgr.step()
+    world = fsm.game_scene.world
+    fsm.request("MainMenu", 0)
+    app.taskMgr.step()
+    return world.getNumRigidBodies() + world.getNumGhosts() + world.getNumCharacters()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=300)
+    parser.add_argument("--frames", type=int, default=30, help="frames to run each game for")
+    parser.add_argument("--warmup", type=int, default=20, help="cycles before the baseline sample")
+    parser.add_argument("--display", default="", help="display module to load, e.g. p3headlessgl")
+    parser.add_argument("--rss-slack-mb", type=float, default=8.0, help="RSS growth allowed after warm-up")
+    args = parser.parse_args()
+
+    loadPrcFileData("", "window-type offscreen")
+    loadPrcFileData("", "audio-library-name null")
+    loadPrcFileData("", "notify-level-device fatal")
+    if args.display:
+        loadPrcFileData("", f"load-display {args.display}")
+    app = game.app = game.App()
+    fsm = app.fsm
+    # step at a fixed rate so each game simulates the same time
+    clock = ClockObject.getGlobalClock()
+    clock.setMode(ClockObject.MNonRealTime)
+    clock.setFrameRate(60)
+
+    baseline = None
+    leaky_cycles = 0
+    for n in range(1, args.cycles + 1):
+        bodies = cycle(app, fsm, args.frames)
+        leaky_cycles += bodies > 0
+        if n == args.warmup:
+            baseline = sample(app, bodies)
+        if n % 50 == 0 or n == args.cycles:
+            print(f"cycle {n}: " + ", ".join(f"{k} {v:.1f}" if isinstance(v, float) else f"{k} {v}" for k, v in sample(app, bodies).items()))
+    final = sample(app, bodies)
+
+    grown = [
+        f"{name} {baseline[name]} -> {final[name]}"
+        for name in ("nodes", "hooks")
+        if final[name] > baseline[name]
+    ]
+    if leaky_cycles:
+        grown.append(f"bodies left in the world after {leaky_cycles} games")
+    # the allocator and gc generations wobble a little; leaks grow per cycle
+    if final["objects"] > baseline["objects"] + args.cycles:
+        grown.append(f"objects {baseline['objects']} -> {final['objects']}")
+    if final["rss_mb"] > baseline["rss_mb"] + args.rss_slack_mb:
+        grown.append(f"rss {baseline['rss_mb']:.1f} -> {final['rss_mb']:.1f} MB")
+    if grown:
+        raise SystemExit("leak after {} cycles: {}".format(args.cycles, "; ".join(grown)))
+    print(f"flat over {args.cycles - args.warmup} cycles after warm-up")
+
+
+if __name__ == "__main__":
+    main()